@@ -15,6 +15,11 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 import json
 
+try:
+    import orjson  # optional: C serializer for large report payloads
+except ImportError:
+    orjson = None
+
 # Load .env when running locally
 load_dotenv()
 
@@ -164,6 +169,18 @@ def process(req: ProcessRequest):
 # Export endpoints
 # -------------------------------------------------------------------------
 
+def _json_bytes(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize a (possibly large) report payload to UTF-8 JSON bytes.
+    Uses orjson when installed; falls back to stdlib json on unsupported types.
+    """
+    if orjson is not None:
+        opts = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(obj, option=opts)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None).encode("utf-8")
+
 def _build_export_payload(run: Dict[str, Any], fmt: str) -> Dict[str, Any]:
     """Normalize and extract export payloads from a run document.
     Expected final structure may contain keys like json_report / markdown_report / html_report.
@@ -173,7 +190,7 @@ def _build_export_payload(run: Dict[str, Any], fmt: str) -> Dict[str, Any]:
     payload: Dict[str, Any] = {}
     if fmt == "json":
         # ensure it's JSON serializable
-        payload["body_bytes"] = (json.dumps(final.get("json_report", final), ensure_ascii=False)).encode("utf-8")
+        payload["body_bytes"] = _json_bytes(final.get("json_report", final))
         payload["content_type"] = "application/json; charset=utf-8"
         payload["ext"] = "json"
     elif fmt == "md":
@@ -231,7 +248,7 @@ def _build_export_payload(run: Dict[str, Any], fmt: str) -> Dict[str, Any]:
             txt = md
         if not txt:
             # fallback to JSON pretty
-            txt = json.dumps(final.get("json_report", final), ensure_ascii=False, indent=2)
+            txt = _json_bytes(final.get("json_report", final), pretty=True).decode("utf-8")
 
         # If we have both question and answer, compose as Q/A
         if isinstance(uq, str) and uq.strip() and isinstance(txt, str) and txt.strip():
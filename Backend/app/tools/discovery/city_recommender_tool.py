@@ -17,10 +17,13 @@ multi-city itineraries that match their travel preferences and time constraints.
 """
 
 from __future__ import annotations
-import os, re, json, math, textwrap, time
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import os, re, json, math, textwrap, time, hashlib, threading
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     from app.tools.tools_utils.state import AppState
@@ -40,6 +43,12 @@ try:
     from openai import OpenAI
 except Exception:
     OpenAI = None
+try:
+    import orjson  # optional: faster parse of the LLM's JSON reply
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 
 # ======================= Config (tunable via ENV) =======================
@@ -53,6 +62,13 @@ MAX_RESULTS_PER_COUNTRY  = int(os.getenv("CITYREC_MAX_RESULTS_PER_COUNTRY", "6")
 MAX_COUNTRY_SNIPPETS     = 2  # <= 2 URLs fed to LLM
 SEARCH_TIMEOUT_SEC       = float(os.getenv("CITYREC_SEARCH_TIMEOUT_SEC", "7"))
 
+# On-disk cache for search/LLM payloads, shared across workers and restarts ("" disables)
+CITYREC_CACHE_DIR        = os.getenv("CITYREC_CACHE_DIR", "/tmp/cityrec")
+CITYREC_CACHE_TTL_SEC    = int(os.getenv("CITYREC_CACHE_TTL_SEC", "86400"))
+
+# Parallelism (one search + one LLM call per country, all network-bound)
+CITYREC_COUNTRY_WORKERS  = int(os.getenv("CITYREC_COUNTRY_WORKERS", "4"))
+
 # Prompt budgets (for Tavily answer + snippets only)
 MAX_SNIPPET_CHARS        = int(os.getenv("CITYREC_MAX_SNIPPET_CHARS", "1200"))
 MIN_KEEP_PER_CHUNK       = int(os.getenv("CITYREC_MIN_KEEP_PER_CHUNK", "500"))
@@ -63,6 +79,26 @@ TEMPERATURE              = 0.0
 
 OFFICIAL_HINTS = (".gov", ".gouv.", ".edu", ".tourism", "visit", "comune.", "city.", ".go.jp", ".govt")
 
+# Precompiled patterns (hot in extraction/scoring paths)
+_OFFICIAL_RE = re.compile("|".join(map(re.escape, OFFICIAL_HINTS)))
+_CITY_TOK_RE = re.compile(r"^[A-ZÀ-Ý][A-Za-zÀ-ÿ'’ -]{1,}$")
+_WS_RE       = re.compile(r"\s+")
+_JSON_TAIL_RE = re.compile(r"\{[\s\S]*\}\s*$")
+
+
+# ======================= Dates =======================
+@lru_cache(maxsize=512)
+def _parse_iso_date(s: str) -> date:
+    # fromisoformat is a C fast path, but on 3.11 it also takes basic/week forms
+    # (20250105, 2025-W01-1) that strptime rejects: only use it for the dashed
+    # YYYY-MM-DD shape; strptime handles the rest (e.g. 2025-1-5) as it always did
+    if len(s) == 10 and s[4] == s[7] == "-":
+        try:
+            return date.fromisoformat(s)
+        except ValueError:
+            pass
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
 
 # ======================= Schema =======================
 class CountryArg(BaseModel):
@@ -91,17 +127,19 @@ class CityRecommenderArgs(BaseModel):
             return v
         try:
             s, e = v.get("start"), v.get("end")
-            datetime.strptime(s[:10], "%Y-%m-%d")
-            datetime.strptime(e[:10], "%Y-%m-%d")
+            _parse_iso_date(s[:10])
+            _parse_iso_date(e[:10])
         except Exception:
             raise ValueError("dates.start/end must be ISO YYYY-MM-DD")
         return v
 
-class CityCandidate(BaseModel):
+@dataclass(slots=True)
+class CityCandidate:
+    # internal output shuttle (built by the tool itself) -> plain dataclass, no validation pass
     city: str
     country: str
     score: float
-    sources: List[str] = Field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
     family_hits: Optional[int] = None
 
 class CityRecommenderResult(BaseModel):
@@ -115,8 +153,8 @@ class CityRecommenderResult(BaseModel):
 
 # ======================= Helpers =======================
 def _trip_days(ds: str, de: str) -> int:
-    s = datetime.strptime(ds[:10], "%Y-%m-%d").date()
-    e = datetime.strptime(de[:10], "%Y-%m-%d").date()
+    s = _parse_iso_date(ds[:10])
+    e = _parse_iso_date(de[:10])
     return (e - s).days + 1
 
 def _recommend_city_count(trip_days: int, pace: str, must_cities: int) -> int:
@@ -134,46 +172,72 @@ def _recommend_city_count(trip_days: int, pace: str, must_cities: int) -> int:
     C = max(1, C)
     return max(C, must_cities)
 
-def _unique_domains(urls: List[str]) -> int:
-    doms = set()
-    for u in urls or []:
-        if "://" in u:
-            doms.add(u.split("/")[2])
-    return len(doms)
-
 def _is_official(url: Optional[str]) -> bool:
     if not url: return False
-    low = url.lower()
-    return any(h in low for h in OFFICIAL_HINTS)
+    return _OFFICIAL_RE.search(url.lower()) is not None
 
 def _clean_city_name(tok: str) -> Optional[str]:
     tok = (tok or "").strip(" .:;–—-()[]")
     if not tok or len(tok) < 2:
         return None
-    if not re.match(r"^[A-ZÀ-Ý][A-Za-zÀ-ÿ'’ -]{1,}$", tok):
+    if not _CITY_TOK_RE.match(tok):
         return None
     if len(tok.split()) > 3:
         return None
     return tok
 
-def _score_city(row, with_kids: bool, musts: List[str], preferred: List[str]) -> float:
+def _name_matcher(items: List[str]) -> Callable[[str], bool]:
+    """
+    Predicate for "lowercased name equals, or is a substring of, any item".
+    Built once per request: a set for exact hits plus one joined blob, so each
+    lookup is a single C-level scan instead of a Python loop over items.
+    """
+    items_lc = [i.lower() for i in items or []]
+    if not items_lc:
+        return lambda nm: False
+    exact = set(items_lc)
+    blob = "\x00".join(items_lc)  # separator can't occur in cleaned city names
+    return lambda nm: nm in exact or nm in blob
+
+def _score_city(row, with_kids: bool, is_must: Callable[[str], bool], is_preferred: Callable[[str], bool]) -> float:
+    """is_must/is_preferred are _name_matcher predicates built once per request."""
     s = 0.0
     if row.get("is_capital"): s += 0.35
     if with_kids and row.get("family_hint"): s += 0.15
-    urls = (row.get("evidence_urls") or []) + (row.get("sources_seed") or [])
-    dom_div = _unique_domains(urls)
-    s += 0.35 * min(1.0, dom_div / 3.0)
-    nm = (row.get("name") or "").lower()
-    if any(nm == m.lower() or nm in m.lower() for m in musts): s += 0.3
-    if any(nm == p.lower() or nm in p.lower() for p in preferred): s += 0.1
-    if any(_is_official(u) for u in urls): s += 0.05
+    # one pass over evidence + seed URLs: domain diversity and official hit together
+    doms = set()
+    official = False
+    for urls in (row.get("evidence_urls"), row.get("sources_seed")):
+        for u in urls or ():
+            if "://" in u:
+                doms.add(u.split("/", 3)[2])
+            if not official and _is_official(u):
+                official = True
+    s += 0.35 * min(1.0, len(doms) / 3.0)
+    nm = row.get("_name_lc") or (row.get("name") or "").lower()
+    if is_must(nm): s += 0.3
+    if is_preferred(nm): s += 0.1
+    if official: s += 0.05
     return round(s, 3)
 
+# Clients are process-wide singletons keyed by API key, so their HTTP connection
+# pools (and TLS sessions) are reused across requests; a rotated key builds a new one.
+@lru_cache(maxsize=1)
+def _tavily_for_key(key: str) -> TavilyClient:
+    return TavilyClient(api_key=key)
+
+@lru_cache(maxsize=1)
+def _openai_for_key(key: str) -> Optional[OpenAI]:
+    try:
+        return OpenAI(api_key=key)
+    except Exception:
+        return None
+
 def _tavily() -> TavilyClient:
     key = os.getenv("TAVILY_API_KEY")
     if not key:
         raise RuntimeError("TAVILY_API_KEY is not set")
-    return TavilyClient(api_key=key)
+    return _tavily_for_key(key)
 
 def _openai_client_or_none() -> Optional[OpenAI]:
     if OpenAI is None:
@@ -181,20 +245,60 @@ def _openai_client_or_none() -> Optional[OpenAI]:
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         return None
+    return _openai_for_key(key)
+
+def _reset_clients() -> None:
+    """Drop cached clients (tests / key rotation)."""
+    _tavily_for_key.cache_clear()
+    _openai_for_key.cache_clear()
+
+
+# ======================= Disk cache (best-effort) =======================
+def _disk_cache_path(kind: str, key_text: str) -> Optional[str]:
+    if not CITYREC_CACHE_DIR:
+        return None
+    digest = hashlib.blake2b(key_text.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(CITYREC_CACHE_DIR, f"{kind}-{digest}.json")
+
+def _disk_cache_get(kind: str, key_text: str) -> Optional[Dict[str, Any]]:
+    path = _disk_cache_path(kind, key_text)
+    if not path:
+        return None
     try:
-        return OpenAI(api_key=key)
-    except Exception:
+        if time.time() - os.path.getmtime(path) > CITYREC_CACHE_TTL_SEC:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return None
 
+def _disk_cache_set(kind: str, key_text: str, value: Dict[str, Any]) -> None:
+    path = _disk_cache_path(kind, key_text)
+    if not path:
+        return
+    try:
+        os.makedirs(CITYREC_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # per thread: _process_country runs on a pool
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)  # atomic: concurrent readers never see a partial file
+    except (OSError, TypeError, ValueError):
+        pass
+
 
 # ======================= Search-only acquisition (1 search/country) =======================
-_SEARCH_CACHE: Dict[str, Dict[str, Any]] = {}
+_SEARCH_CACHE: Dict[str, Dict[str, Any]] = {}  # in-process front of the disk cache
 
 def _country_query(country: str, with_kids: bool) -> str:
     kid = " family friendly" if with_kids else ""
     # single concise query; ask for official leaning
     return f"best cities to visit in {country}{kid}. Prefer official tourism websites."
 
+def _country_cache_key(country: str, with_kids: bool) -> str:
+    # "Japan", " japan ", "JAPAN" all ask the same question -> one cache entry
+    norm = " ".join((country or "").split()).casefold()
+    return _country_query(norm, with_kids)
+
 def _search_minimal_for_country(tv: TavilyClient, country: str, with_kids: bool) -> Tuple[List[Dict[str,str]], Optional[str]]:
     """
     Single Tavily search call per country.
@@ -202,18 +306,23 @@ def _search_minimal_for_country(tv: TavilyClient, country: str, with_kids: bool)
     Each result: {url,title,content}
     """
     q = _country_query(country, with_kids)
-    if q in _SEARCH_CACHE:
-        sr = _SEARCH_CACHE[q]
+    ck = _country_cache_key(country, with_kids)
+    if ck in _SEARCH_CACHE:
+        sr = _SEARCH_CACHE[ck]
     else:
-        sr = tv.search(
-            q,
-            include_answer=True,
-            search_depth=SEARCH_DEPTH,
-            max_results=MAX_RESULTS_PER_COUNTRY,
-            include_raw_content=False,
-            timeout=SEARCH_TIMEOUT_SEC,
-        ) or {}
-        _SEARCH_CACHE[q] = sr
+        sr = _disk_cache_get("search", ck)
+        if sr is None:
+            sr = tv.search(
+                q,
+                include_answer=True,
+                search_depth=SEARCH_DEPTH,
+                max_results=MAX_RESULTS_PER_COUNTRY,
+                include_raw_content=False,
+                timeout=SEARCH_TIMEOUT_SEC,
+            ) or {}
+            if sr.get("results") or sr.get("answer"):
+                _disk_cache_set("search", ck, sr)
+        _SEARCH_CACHE[ck] = sr
 
     # Collect results
     all_results: List[Dict[str,str]] = []
@@ -247,7 +356,7 @@ def _search_minimal_for_country(tv: TavilyClient, country: str, with_kids: bool)
 def _trim_text(s: str, per_chunk: int, min_keep: int) -> str:
     s = (s or "").strip()
     if not s: return s
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     allow = max(min_keep, per_chunk)
     return s[:allow]
 
@@ -262,16 +371,8 @@ def _cap_chunks(chunks: List[Tuple[str,str]], total_cap: int, min_keep: int) ->
         out.append((u, t[:allow]))
     return out
 
-def _build_city_prompt_from_snippets(
-    country: str,
-    with_kids: bool,
-    answer_text: Optional[str],
-    results: List[Dict[str,str]],
-    given_cities: List[str],
-    musts: List[str],
-    preferred: List[str],
-) -> Tuple[str, List[str]]:
-    header = f"""
+# Prompt header dedented once at import; per-call work is a single str.format
+_CITY_PROMPT_HEADER = textwrap.dedent("""
     Extract city recommendations for short trips in {country} from the notes below.
     Return STRICT JSON:
     {{
@@ -287,13 +388,30 @@ def _build_city_prompt_from_snippets(
     Rules:
     - Prefer well-known tourist cities; avoid regions/islands/counties/lakes/coasts.
     - If kids are present, give weight to mentions of zoos, aquariums, science museums, parks, kid attractions.
-    - Cap at most {MAX_CITY_CANDIDATES} items.
+    - Cap at most {max_candidates} items.
     - Include user-provided and MUST/Preferred when plausible:
-      * Provided (keep unless clearly unsuitable): {given_cities or []}
-      * MUST: {musts or []}
-      * Preferred: {preferred or []}
+      * Provided (keep unless clearly unsuitable): {given}
+      * MUST: {musts}
+      * Preferred: {preferred}
     - JSON only.
-    """
+    """)
+
+def _build_city_prompt_from_snippets(
+    country: str,
+    with_kids: bool,
+    answer_text: Optional[str],
+    results: List[Dict[str,str]],
+    given_cities: List[str],
+    musts: List[str],
+    preferred: List[str],
+) -> Tuple[str, List[str]]:
+    header = _CITY_PROMPT_HEADER.format(
+        country=country,
+        max_candidates=MAX_CITY_CANDIDATES,
+        given=given_cities or [],
+        musts=musts or [],
+        preferred=preferred or [],
+    )
     kid_line = ("Children present; lean slightly kid-friendly." if with_kids
                 else "Adults only; no special kid focus.")
 
@@ -312,13 +430,23 @@ def _build_city_prompt_from_snippets(
 
     chunks = _cap_chunks(chunks, MAX_TOTAL_CHARS_PROMPT, MIN_KEEP_PER_CHUNK)
 
-    parts = [textwrap.dedent(header), kid_line, "\n\n"]
+    parts = [header, kid_line, "\n\n"]
     for (u, t) in chunks:
         parts.append(f"[SOURCE] {u}\n[TEXT]\n{t}\n\n")
 
     return "".join(parts), sources
 
 def _extract_cities_with_llm(ocli: OpenAI, model: str, prompt: str) -> Dict[str, Any]:
+    cache_key = f"{model}\n{prompt}"
+    cached = _disk_cache_get("llm", cache_key)
+    if cached is not None:
+        return cached
+    data = _extract_cities_with_llm_uncached(ocli, model, prompt)
+    if isinstance(data, dict) and data.get("cities"):
+        _disk_cache_set("llm", cache_key, data)
+    return data
+
+def _extract_cities_with_llm_uncached(ocli: OpenAI, model: str, prompt: str) -> Dict[str, Any]:
     resp = ocli.chat.completions.create(
         model=model,
         temperature=TEMPERATURE,
@@ -330,10 +458,10 @@ def _extract_cities_with_llm(ocli: OpenAI, model: str, prompt: str) -> Dict[str,
     )
     txt = resp.choices[0].message.content  # type: ignore
     try:
-        return json.loads(txt)
-    except Exception:
-        m = re.search(r"\{[\s\S]*\}\s*$", txt or "")
-        return json.loads(m.group(0)) if m else {"cities": []}
+        return _json_loads(txt)  # response_format=json_object: the happy path
+    except (TypeError, ValueError):  # both decoders' JSONDecodeError subclass ValueError
+        m = _JSON_TAIL_RE.search(txt or "")
+        return _json_loads(m.group(0)) if m else {"cities": []}
 
 
 # ======================= Tool (pure) =======================
@@ -382,17 +510,13 @@ def city_recommender_tool(args: CityRecommenderArgs) -> CityRecommenderResult:
         tripdays = None
         provisional_C = args.default_recommend_count
 
-    # Search (ULTRA-FAST) → LLM per country
-    rows: List[Dict[str, Any]] = []
-    per_country_stats: Dict[str, Dict[str,int]] = {}
-
-    for country in countries:
+    # Search (ULTRA-FAST) → LLM per country; countries are independent I/O pipelines
+    def _process_country(country: str) -> Tuple[str, List[Dict[str, Any]], _Stats, str]:
         results, answer = _search_minimal_for_country(tv, country, with_kids)
-        seeds = [r["url"] for r in results]
+        seeds = tuple(r["url"] for r in results)  # immutable, shared by every row of this country
         if not (answer or results):
-            logs.append(f"City_Recommender[{country}]: empty search (answer/results)")
-            per_country_stats[country] = _Stats(seeds=0, pages=0, extracted=0, kept=0)
-            continue
+            return (country, [], _Stats(seeds=0, pages=0, extracted=0, kept=0),
+                    f"City_Recommender[{country}]: empty search (answer/results)")
 
         given_for_country = [gc for gc in given_cities if (given_city_country.get(gc) in (None, country))]
         prompt, sources_used = _build_city_prompt_from_snippets(
@@ -407,66 +531,91 @@ def city_recommender_tool(args: CityRecommenderArgs) -> CityRecommenderResult:
         data = _extract_cities_with_llm(ocli, model, prompt)
         raw = (data or {}).get("cities") or []
 
-        kept = 0
+        country_rows: List[Dict[str, Any]] = []
+        country_lc = country.lower()
         seen = set()
         for item in raw:
             name = _clean_city_name(item.get("name") or "")
             if not name:
                 continue
-            kl = (name.lower(), country.lower())
+            kl = (name.lower(), country_lc)
             if kl in seen:
                 continue
             seen.add(kl)
-            rows.append({
+            country_rows.append({
                 "name": name,
+                "_name_lc": kl[0],  # lowercased once; reused by scoring/selection
                 "country": country,
                 "is_capital": item.get("is_capital") if isinstance(item.get("is_capital"), bool) else None,
                 "family_hint": item.get("family_hint") if isinstance(item.get("family_hint"), bool) else None,
                 "evidence_urls": [u for u in (item.get("evidence_urls") or []) if isinstance(u, str) and u.strip()],
-                "sources_seed": seeds[:],
+                "sources_seed": seeds,
             })
-            kept += 1
 
-        # Ensure user-provided cities present
+        # Ensure user-provided cities present (`seen` already holds every (name, country) key kept above)
         for gc in given_for_country:
-            if not any(r["name"].lower() == gc.lower() and r["country"].lower() == country.lower() for r in rows):
-                rows.append({
+            kl = (gc.lower(), country_lc)
+            if kl not in seen:
+                seen.add(kl)
+                country_rows.append({
                     "name": gc,
+                    "_name_lc": kl[0],
                     "country": country,
                     "is_capital": None,
                     "family_hint": None,
                     "evidence_urls": [],
-                    "sources_seed": seeds[:],
+                    "sources_seed": seeds,
                 })
-                kept += 1
 
-        per_country_stats[country] = _Stats(seeds=len(seeds), pages=len(results), extracted=len(raw), kept=kept)
-        logs.append(
-            f"City_Recommender[{country}]: 1 search call, answer={bool(answer)}, snippet_urls={len(results)}, kept={kept}"
-        )
+        kept = len(country_rows)
+        stats = _Stats(seeds=len(seeds), pages=len(results), extracted=len(raw), kept=kept)
+        return (country, country_rows, stats,
+                f"City_Recommender[{country}]: 1 search call, answer={bool(answer)}, snippet_urls={len(results)}, kept={kept}")
+
+    by_country: Dict[str, Tuple[List[Dict[str, Any]], _Stats, str]] = {}
+    with ThreadPoolExecutor(max_workers=min(CITYREC_COUNTRY_WORKERS, max(1, len(countries)))) as pool:
+        futures = {pool.submit(_process_country, c): c for c in dict.fromkeys(countries)}
+        for fut in as_completed(futures):
+            country, country_rows, stats, line = fut.result()
+            by_country[country] = (country_rows, stats, line)
+
+    # Merge in input order so rows/logs stay deterministic regardless of completion order
+    rows: List[Dict[str, Any]] = []
+    per_country_stats: Dict[str, Dict[str,int]] = {}
+    for country in dict.fromkeys(countries):
+        country_rows, stats, line = by_country[country]
+        rows.extend(country_rows)
+        per_country_stats[country] = stats
+        logs.append(line)
 
     if not rows:
         raise RuntimeError("No cities found for the given countries. Try different inputs.")
 
     # Score & rank
+    is_must = _name_matcher(args.musts)
+    is_preferred = _name_matcher(args.preferred_cities)
     for r in rows:
-        r["score"] = _score_city(r, with_kids, args.musts, args.preferred_cities)
-    rows.sort(key=lambda r: (-r["score"], r["country"], r["name"]))
+        r["score"] = _score_city(r, with_kids, is_must, is_preferred)
+    # Same order as key=(-score, country, name): two stable sorts with C-level itemgetter keys
+    rows.sort(key=itemgetter("country", "name"))
+    rows.sort(key=itemgetter("score"), reverse=True)
 
     # Decide final C
-    must_cities = [r["name"] for r in rows if any(r["name"].lower() == m.lower() or r["name"].lower() in m.lower() for m in args.musts)]
+    must_cities = [r["name"] for r in rows if is_must(r["_name_lc"])]
+    must_set = set(must_cities)
     if tripdays is not None:
         C = _recommend_city_count(tripdays, pace, len(must_cities))
     else:
         C = max(provisional_C, len(must_cities))
 
     picked: List[str] = []
+    picked_set = set()  # O(1) "already picked" checks across the three passes
     city_country_map: Dict[str, str] = {}
 
     # A) include musts first (respect ranking)
     for r in rows:
-        if r["name"] in must_cities and r["name"] not in picked:
-            picked.append(r["name"]); city_country_map[r["name"]] = r["country"]
+        if r["name"] in must_set and r["name"] not in picked_set:
+            picked.append(r["name"]); picked_set.add(r["name"]); city_country_map[r["name"]] = r["country"]
         if len(picked) >= C:
             break
 
@@ -477,8 +626,8 @@ def city_recommender_tool(args: CityRecommenderArgs) -> CityRecommenderResult:
             if country in covered:
                 continue
             for r in rows:
-                if r["country"] == country and r["name"] not in picked:
-                    picked.append(r["name"]); city_country_map[r["name"]] = r["country"]
+                if r["country"] == country and r["name"] not in picked_set:
+                    picked.append(r["name"]); picked_set.add(r["name"]); city_country_map[r["name"]] = r["country"]
                     break
             if len(picked) >= C:
                 break
@@ -486,8 +635,8 @@ def city_recommender_tool(args: CityRecommenderArgs) -> CityRecommenderResult:
     # C) fill remaining by global rank
     if len(picked) < C:
         for r in rows:
-            if r["name"] not in picked:
-                picked.append(r["name"]); city_country_map[r["name"]] = r["country"]
+            if r["name"] not in picked_set:
+                picked.append(r["name"]); picked_set.add(r["name"]); city_country_map[r["name"]] = r["country"]
             if len(picked) >= C:
                 break
 
@@ -499,7 +648,7 @@ def city_recommender_tool(args: CityRecommenderArgs) -> CityRecommenderResult:
             "city": r["name"],
             "country": r["country"],
             "score": round(float(r["score"]), 2),
-            "sources": list(dict.fromkeys((r.get("evidence_urls") or []) + (r.get("sources_seed") or []))),
+            "sources": list(dict.fromkeys(chain(r.get("evidence_urls") or (), r.get("sources_seed") or ()))),
         }
         if with_kids_flag:
             base["family_hits"] = 1 if r.get("family_hint") else 0
@@ -546,7 +695,7 @@ def run_city_recommender_as_state(state: AppState) -> AppState:
     req["cities"] = out.cities
     req["city_country_map"] = out.city_country_map
     req["recommended_city_count"] = out.recommended_city_count
-    req["city_candidates"] = [c.model_dump() for c in out.city_candidates]
+    req["city_candidates"] = [asdict(c) for c in out.city_candidates]
 
     logs.extend(out.logs)
     req.setdefault("stats", {})["city_recommender"] = out.stats
@@ -21,6 +21,7 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 from copy import deepcopy
 import json, os, re
+from types import MappingProxyType
 
 # ================= Env knobs (tiny, safe) =================
 MAX_RESULTS_PER_QUERY = int(os.getenv("GAP_MAX_RESULTS_PER_QUERY", "1"))  # stick to 1
@@ -109,13 +110,14 @@ def _is_money_schema(schema: Optional[str]) -> bool:
     return isinstance(props, dict) and "amount" in props and "currency" in props
 
 NUM_RE = re.compile(r"\d+(?:[.,]\d+)?")
-SYM_TO_ISO = {"¥":"JPY","€":"EUR","$":"USD","£":"GBP"}
-WORD_TO_ISO = {
+# Read-only lookup tables (shared across threads; never mutated)
+SYM_TO_ISO = MappingProxyType({"¥":"JPY","€":"EUR","$":"USD","£":"GBP"})
+WORD_TO_ISO = MappingProxyType({
     "yen":"JPY","jpy":"JPY",
     "eur":"EUR","euro":"EUR","euros":"EUR",
     "usd":"USD","dollar":"USD","dollars":"USD",
     "gbp":"GBP","pound":"GBP","pounds":"GBP",
-}
+})
 
 def _norm_amount(val: Any) -> Optional[float]:
     if isinstance(val, (int, float)): return float(val)
@@ -17,8 +17,12 @@ geographical and cost information that enables efficient itinerary planning.
 """
 
 from __future__ import annotations
-import math, hashlib
-from typing import Any, Dict, List, Optional, Tuple
+import math, hashlib, json, os, threading
+from array import array
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # If you don't have a formal AppState, this will still import; in tests you can stub it.
 try:
@@ -56,6 +60,13 @@ DEFAULT_POI_OPEN_MIN  = 9*60    # 09:00
 DEFAULT_POI_CLOSE_MIN = 18*60   # 18:00
 DEFAULT_POI_DWELL_MIN = 60      # 60 minutes baseline
 
+# Node type codes for the per-city type column
+NT_HOTEL, NT_POI, NT_MEAL = 0, 1, 2
+_NODE_TYPE_CODE = {"hotel": NT_HOTEL, "poi": NT_POI, "meal": NT_MEAL}
+
+# Cross-call cache of assembled city graphs (0 disables)
+GEOCOST_CACHE_SIZE = int(os.getenv("GEOCOST_CACHE_SIZE", "64"))
+
 # ------------------- Small helpers -------------------
 def _money(amount: Optional[float], currency: Optional[str]) -> Optional[Dict[str, Any]]:
     if amount is None or currency is None:
@@ -63,17 +74,34 @@ def _money(amount: Optional[float], currency: Optional[str]) -> Optional[Dict[st
     return {"amount": round(float(amount), 2), "currency": str(currency).upper()}
 
 
-def _haversine_km(lat1, lon1, lat2, lon2) -> float:
-    try:
-        from math import radians, sin, cos, asin, sqrt
-        R = 6371.0088
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return R * c
-    except Exception:
-        return BUCKET_KM["m"]
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # inputs are already-coerced floats (_get_latlon/_city_centroid), so no guard needed here
+    from math import radians, sin, cos, asin, sqrt
+    R = 6371.0088
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(min(1.0, a)))
+    return R * c
+
+
+def _haversine_pairs(coords: List[Optional[Tuple[float, float]]]) -> List[Optional[float]]:
+    """
+    Great-circle distances (km) for the upper triangle only, one entry per pair (i<j)
+    in itertools.combinations order, so the edge loop can walk it with a single index.
+    Radians/cosines are computed once per node; pairs missing coords on either side stay None.
+    """
+    from math import radians, sin, cos, asin, sqrt
+    R2 = 2 * 6371.0088
+    trig = [(radians(c[0]), radians(c[1]), cos(radians(c[0]))) if c else None for c in coords]
+    dist: List[Optional[float]] = []
+    for ti, tj in combinations(trig, 2):
+        if ti is None or tj is None:
+            dist.append(None)
+            continue
+        a = sin((tj[0] - ti[0]) / 2) ** 2 + ti[2] * tj[2] * sin((tj[1] - ti[1]) / 2) ** 2
+        dist.append(R2 * asin(sqrt(min(1.0, a))))
+    return dist
 
 
 def _mins_for(distance_km: float, kmh: float, extra_min: float = 0.0) -> int:
@@ -82,15 +110,25 @@ def _mins_for(distance_km: float, kmh: float, extra_min: float = 0.0) -> int:
     return int(round((distance_km / kmh) * 60.0 + extra_min))
 
 
-def _get_latlon(p: Dict[str, Any]) -> Optional[Tuple[float, float]]:
-    lat = p.get("lat")
-    lon = p.get("lon", p.get("lng"))
+def _coerce_latlon(lat: Any, lon: Any) -> Optional[Tuple[float, float]]:
+    """Float (lat, lon) pair, or None if missing, non-numeric, non-finite or out of range."""
+    if lat is None or lon is None:
+        return None
     try:
-        if lat is None or lon is None:
-            return None
-        return (float(lat), float(lon))
-    except Exception:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    # float() takes "inf"/"nan"; those would blow up (or poison) the haversine math
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
         return None
+    return (lat, lon)
+
+
+def _get_latlon(p: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Coerce a POI's coords to floats once at node-build time; None if missing/malformed."""
+    return _coerce_latlon(p.get("lat"), p.get("lon", p.get("lng")))
 
 
 def _poi_window(p: Dict[str, Any]) -> Tuple[int, int]:
@@ -98,63 +136,71 @@ def _poi_window(p: Dict[str, Any]) -> Tuple[int, int]:
     close_min = p.get("close_min", DEFAULT_POI_CLOSE_MIN)
     try:
         return int(open_min), int(close_min)
-    except Exception:
+    except (TypeError, ValueError):
         return DEFAULT_POI_OPEN_MIN, DEFAULT_POI_CLOSE_MIN
 
 
 def _poi_dwell(p: Dict[str, Any]) -> int:
     dw = p.get("dwell_min")
+    if dw is None:
+        return DEFAULT_POI_DWELL_MIN
     try:
-        return int(dw) if dw is not None else DEFAULT_POI_DWELL_MIN
-    except Exception:
+        return int(dw)
+    except (TypeError, ValueError):
         return DEFAULT_POI_DWELL_MIN
 
 
 def _city_centroid(cblob: Dict[str, Any]) -> Optional[Tuple[float,float]]:
     c = (cblob.get("centroid") or cblob.get("center") or cblob.get("coords") or {})
-    lat = c.get("lat")
-    lon = c.get("lon", c.get("lng"))
-    try:
-        if lat is None or lon is None:
-            return None
-        return float(lat), float(lon)
-    except Exception:
-        return None
+    return _coerce_latlon(c.get("lat"), c.get("lon", c.get("lng")))
 
 
+@lru_cache(maxsize=1024)
 def _det_hash(*parts: str) -> int:
-    h = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
-    return int(h[:12], 16)  # 48-bit chunk is plenty
+    # non-cryptographic use: blake2b is cheaper than sha256; 48 bits is plenty
+    h = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=6).digest()
+    return int.from_bytes(h, "big")
+
+
+# Per-edge variability channels (mixed into the edge hash)
+_CH_WALK, _CH_TRANSIT, _CH_TAXI, _CH_WAIT, _CH_BUCKET = 1, 2, 3, 4, 5
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer: cheap deterministic 64-bit integer hash (no string/SHA work)."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
 
 
-def _bucket_for(a_id: str, b_id: str, city: str) -> Tuple[float, str]:
+# Bucket fallback as flat tuples: pick (0..9) -> bucket index -> (km, quality name)
+_BUCKET_KEYS  = ("xs", "s", "m", "l", "xl")
+_BUCKETS      = tuple(BUCKET_KM[k] for k in _BUCKET_KEYS)
+_BUCKET_NAMES = tuple(f"bucket_{k}" for k in _BUCKET_KEYS)
+_BUCKET_OF_PICK = (0, 0, 1, 1, 1, 2, 2, 2, 3, 4)  # 20% xs, 30% s, 30% m, 10% l, 10% xl
+
+
+def _bucket_for(edge_h: int) -> Tuple[float, str]:
     """Deterministic short/medium/long buckets when coords missing."""
-    h = _det_hash(a_id, b_id, city)
-    pick = h % 10
-    if pick <= 1:
-        return BUCKET_KM["xs"], "bucket_xs"
-    if pick <= 4:
-        return BUCKET_KM["s"],  "bucket_s"
-    if pick <= 7:
-        return BUCKET_KM["m"],  "bucket_m"
-    if pick == 8:
-        return BUCKET_KM["l"],  "bucket_l"
-    return BUCKET_KM["xl"], "bucket_xl"
-
-
-def _pair_distance_km(A: Dict[str, Any], B: Dict[str, Any], cblob: Dict[str, Any], city: str) -> Tuple[float, str]:
-    a = _get_latlon(A); b = _get_latlon(B)
-    if a and b:
-        return _haversine_km(a[0], a[1], b[0], b[1]), "haversine"
-    # try centroid-assisted estimate if one side is missing
-    cen = _city_centroid(cblob)
-    if cen and a and not b:
-        # approx other side as centroid; inflate slightly
-        return _haversine_km(a[0], a[1], cen[0], cen[1]) * 1.25, "centroid_one_missing"
-    if cen and b and not a:
-        return _haversine_km(b[0], b[1], cen[0], cen[1]) * 1.25, "centroid_one_missing"
+    b = _BUCKET_OF_PICK[_mix64(edge_h ^ _CH_BUCKET) % 10]
+    return _BUCKETS[b], _BUCKET_NAMES[b]
+
+
+def _pair_distance_km(a_cen_km: Optional[float], b_cen_km: Optional[float], edge_h: int) -> Tuple[float, str]:
+    """
+    Fallback distance for a pair where at least one side lacks coords.
+    a_cen_km/b_cen_km are the node's precomputed (inflated) distance to the city centroid,
+    None when that node has no coords or the city has no centroid.
+    """
+    # centroid-assisted estimate if one side is missing (other side approximated as centroid)
+    if a_cen_km is not None:
+        return a_cen_km, "centroid_one_missing"
+    if b_cen_km is not None:
+        return b_cen_km, "centroid_one_missing"
     # both missing (or no centroid) → bucket distance (deterministic)
-    return _bucket_for(A["id"], B["id"], city)
+    return _bucket_for(edge_h)
 
 
 def _transit_edge_cost_ccy(city_blob: Dict[str, Any]) -> Tuple[Optional[float], Optional[str], str]:
@@ -181,24 +227,238 @@ def _taxi_formula(city_blob: Dict[str, Any]) -> Tuple[Optional[float], Optional[
     return tx.get("base"), tx.get("per_km"), tx.get("per_min"), tx.get("currency")
 
 
-def _speed_from_range(rng: Tuple[float,float], key: str) -> float:
-    """Deterministic speed selection inside a range based on a key."""
+def _speed_from_range(rng: Tuple[float,float], h: int) -> float:
+    """Deterministic speed selection inside a range based on an integer hash."""
     low, high = rng
     span = max(0.0, high - low)
     if span == 0:
         return low
-    h = _det_hash(key)
     frac = (h % 10_000) / 10_000.0  # [0,1)
     return low + frac * span
 
 
-def _wait_from_range(rng: Tuple[int,int], key: str) -> int:
+def _wait_from_range(rng: Tuple[int,int], h: int) -> int:
     low, high = rng
     if low >= high:
         return low
-    h = _det_hash(key)
     return low + (h % (high - low + 1))
 
+
+# Meal edges are a fixed local hop, so their minutes are drawn once from mid-range speeds/wait
+_MEAL_WALK_MIN    = _mins_for(MEAL_LOCAL_KM, sum(WALK_KMH_RANGE) / 2, 0)
+_MEAL_TRANSIT_MIN = _mins_for(MEAL_LOCAL_KM, sum(TRANSIT_KMH_RANGE) / 2, sum(TRANSIT_WAIT_MIN_RANGE) // 2)
+_MEAL_TAXI_MIN    = _mins_for(MEAL_LOCAL_KM, sum(TAXI_KMH_RANGE) / 2, 0)
+
+
+def _edge_kernel(d_km: float, edge_h: int,
+                 base_c: float, per_km_c: float, per_min_c: float) -> Tuple[int, int, int, int]:
+    """
+    Numeric core of one edge: deterministic speed/wait draws, minutes per mode and taxi fare.
+    Pure float/int work (no dicts) so the caller only assembles payloads around it.
+    Taxi rates come in pre-scaled to cents. Returns (walk_min, transit_min, taxi_min, taxi_cents).
+    """
+    v_walk  = _speed_from_range(WALK_KMH_RANGE,    _mix64(edge_h ^ _CH_WALK))
+    v_trans = _speed_from_range(TRANSIT_KMH_RANGE, _mix64(edge_h ^ _CH_TRANSIT))
+    v_taxi  = _speed_from_range(TAXI_KMH_RANGE,    _mix64(edge_h ^ _CH_TAXI))
+    t_wait  = _wait_from_range(TRANSIT_WAIT_MIN_RANGE, _mix64(edge_h ^ _CH_WAIT))
+
+    # _mins_for inlined: speed ranges are positive constants, so its guards never fire here
+    walk_min    = int(round((d_km / v_walk) * 60.0))
+    transit_min = int(round((d_km / v_trans) * 60.0 + t_wait))
+    taxi_min    = int(round((d_km / v_taxi) * 60.0))
+
+    # Taxi cost formula (missing components contribute 0)
+    taxi_cents = int(round(base_c + per_km_c * d_km + per_min_c * taxi_min))
+    return walk_min, transit_min, taxi_min, taxi_cents
+
+# Edges are kept as parallel columns (structure-of-arrays); dicts are only built in _iter_edges.
+# Indices are 16-bit, minutes/distance 32-bit (distance as integer hundredths of a km), quality
+# 8-bit; taxi_cents stays 64-bit: minor-unit fares (VND, IDR) over long haversine hops can pass 2**31.
+_EdgeSoA = namedtuple("_EdgeSoA", "a_idx b_idx walk_min transit_min taxi_min dist_hkm taxi_cents quality")
+_CityGraph = namedtuple("_CityGraph", "nodes edges walk_cost transit_cost taxi_ccy")
+
+_QUALITIES = ("haversine", "centroid_one_missing", *_BUCKET_NAMES, "assumed_local_meal")
+_QUALITY_CODE = {q: i for i, q in enumerate(_QUALITIES)}
+
+
+def _assemble_city(city: str, cblob: Dict[str, Any]) -> _CityGraph:
+    """Build nodes + complete edge set (column store) for one city's discovery blob."""
+    pois  = cblob.get("pois") or []
+
+    # --- Build nodes ---
+    nodes: List[Dict[str, Any]] = []
+    id_map: Dict[str, int] = {}
+
+    # 0) Hotel (assume city-center hotel; coords optional)
+    hotel = {"id": "H", "type": "hotel", "name": f"{city} Hotel", "open_min": 6*60, "close_min": 23*60, "dwell_min": 0}
+    # pass through centroid as hotel coords if provided
+    cen = _city_centroid(cblob)
+    if cen:
+        hotel.update({"lat": cen[0], "lon": cen[1]})
+    nodes.append(hotel); id_map["H"] = 0
+    # Validated float coords per node, filled alongside nodes (None = no usable coords)
+    coords: List[Optional[Tuple[float, float]]] = [cen]
+
+    # 1) POIs
+    for i, p in enumerate(pois, start=1):
+        nm = (p.get("name") or f"POI {i}").strip()
+        open_min, close_min = _poi_window(p)
+        dwell_min = _poi_dwell(p)
+        ll = _get_latlon(p)
+        node = {
+            "id": f"P{i}",
+            "type": "poi",
+            "name": nm,
+            "open_min": open_min,
+            "close_min": close_min,
+            "dwell_min": dwell_min,
+            # pass through coords if present
+            **({ "lat": p.get("lat"), "lon": p.get("lon", p.get("lng")) } if ll else {}),
+        }
+        nodes.append(node); coords.append(ll)
+        id_map[node["id"]] = len(nodes) - 1
+
+    # 2) Meals
+    MEAL_SLOTS = [
+        {"id": "MB", "name": "Breakfast", "open_min": 7*60,  "close_min": 10*60+30, "dwell_min": 45},
+        {"id": "ML", "name": "Lunch",     "open_min": 12*60, "close_min": 14*60+30, "dwell_min": 45},
+        {"id": "MD", "name": "Dinner",    "open_min": 18*60, "close_min": 21*60+30, "dwell_min": 45},
+    ]
+    for m in MEAL_SLOTS:
+        node = {
+            "id": m["id"],
+            "type": "meal",
+            "name": m["name"],
+            "open_min": m["open_min"],
+            "close_min": m["close_min"],
+            "dwell_min": m["dwell_min"],
+        }
+        nodes.append(node); coords.append(None)
+        id_map[node["id"]] = len(nodes) - 1
+
+    # --- Edge costs/time model (per-city invariants hoisted out of the edge loop) ---
+    # Transit marginal cost per edge
+    transit_unit_cost, transit_ccy, _note = _transit_edge_cost_ccy(cblob)
+    base, per_km, per_min, taxi_ccy = _taxi_formula(cblob)
+    # Taxi money is kept in integer cents until emission; rates are scaled once per city
+    base_c    = float(base)    * 100 if base    is not None else 0.0
+    per_km_c  = float(per_km)  * 100 if per_km  is not None else 0.0
+    per_min_c = float(per_min) * 100 if per_min is not None else 0.0
+    # Walk is free; transit is pass-included or single fare (same for every edge)
+    walk_cost    = _money(0.0, transit_ccy or taxi_ccy)
+    transit_cost = _money(transit_unit_cost or 0.0, transit_ccy)
+
+    # Typed node columns indexed by node position; the edge loop never touches node dicts
+    types  = array("b", [_NODE_TYPE_CODE[n["type"]] for n in nodes])
+    # Upper-triangle haversine distances, aligned with the edge loop below (computed once per city)
+    hav = _haversine_pairs(coords)
+    # Per-node distance to the centroid (inflated slightly), reused by every one-side-missing pair
+    cen_km = [_haversine_km(c[0], c[1], cen[0], cen[1]) * 1.25 if (c and cen) else None for c in coords]
+    # One string hash per city; per-edge draws are integer mixes of (seed, a, b, channel)
+    city_seed = _det_hash(city)
+    # Meal edges share one row per city (fixed local hop, mid-range speeds)
+    meal_taxi_cents = int(round(base_c + per_km_c * MEAL_LOCAL_KM + per_min_c * _MEAL_TAXI_MIN))
+    meal_hkm, meal_q = int(round(MEAL_LOCAL_KM * 100)), _QUALITY_CODE["assumed_local_meal"]
+
+    # --- Build complete graph edges (undirected; store a<b) as parallel columns ---
+    soa = _EdgeSoA(array("H"), array("H"), array("i"), array("i"), array("i"), array("i"), array("q"), array("B"))
+    for k, (ai, bi) in enumerate(combinations(range(len(nodes)), 2)):
+        if types[ai] == NT_MEAL or types[bi] == NT_MEAL:
+            # Meal edges: assume a small local hop (MEAL_LOCAL_KM), not zero; no per-edge draws
+            row = (_MEAL_WALK_MIN, _MEAL_TRANSIT_MIN, _MEAL_TAXI_MIN, meal_hkm, meal_taxi_cents, meal_q)
+        else:
+            # Integer edge key: (city seed, a index, b index) -> 64-bit hash; no per-edge strings
+            edge_h = _mix64(city_seed ^ (ai << 20) ^ bi)
+            # Distance: precomputed haversine when both sides have coords, else fallbacks
+            d_km = hav[k]
+            if d_km is not None:
+                quality = "haversine"
+            else:
+                d_km, quality = _pair_distance_km(cen_km[ai], cen_km[bi], edge_h)
+            walk_min, transit_min, taxi_min, taxi_cents = _edge_kernel(
+                d_km, edge_h, base_c, per_km_c, per_min_c
+            )
+            row = (walk_min, transit_min, taxi_min, int(round(d_km * 100)), taxi_cents, _QUALITY_CODE[quality])
+        soa.a_idx.append(ai); soa.b_idx.append(bi)
+        soa.walk_min.append(row[0]); soa.transit_min.append(row[1]); soa.taxi_min.append(row[2])
+        soa.dist_hkm.append(row[3]); soa.taxi_cents.append(row[4]); soa.quality.append(row[5])
+
+    return _CityGraph(
+        nodes=nodes,
+        edges=soa,
+        walk_cost=walk_cost,
+        transit_cost=transit_cost,
+        taxi_ccy=str(taxi_ccy).upper() if taxi_ccy is not None else None,
+    )
+
+
+def _iter_edges(g: _CityGraph) -> Iterator[Dict[str, Any]]:
+    """Lazily materialize edge dicts from the column store (fresh dicts on every pass)."""
+    ids = [n["id"] for n in g.nodes]
+    walk_cost, transit_cost, taxi_ccy = g.walk_cost, g.transit_cost, g.taxi_ccy
+    for ai, bi, w, t, x, hkm, cents, q in zip(*g.edges):
+        yield {
+            "a": ids[ai], "b": ids[bi],
+            "walk":    {"min": w, "cost": walk_cost and dict(walk_cost)},
+            "transit": {"min": t, "cost": transit_cost and dict(transit_cost)},
+            "taxi":    {"min": x, "cost": {"amount": cents / 100, "currency": taxi_ccy} if taxi_ccy else None},
+            "distance_km": hkm / 100,
+            "quality": _QUALITIES[q],
+        }
+
+
+def _emit_city(g: _CityGraph) -> Dict[str, Any]:
+    """Serialization boundary: the nodes/edges/assumptions blob stored in request['geocost']."""
+    return {
+        "nodes": [dict(n) for n in g.nodes],
+        "edges": list(_iter_edges(g)),  # state is JSON-serialized / re-read downstream
+        "assumptions": {
+            "distance_mode": "haversine/centroid/buckets",
+            "buckets_km": dict(BUCKET_KM),
+            "speed_ranges_kmh": {
+                "walk": WALK_KMH_RANGE,
+                "transit": TRANSIT_KMH_RANGE,
+                "taxi": TAXI_KMH_RANGE,
+            },
+            "transit_wait_min_range": TRANSIT_WAIT_MIN_RANGE,
+            "meal_local_km": MEAL_LOCAL_KM,
+        },
+    }
+
+
+# Assembled city graphs keyed by a content hash of (city, discovery blob); bounded LRU.
+_GEOCOST_CACHE: "OrderedDict[str, _CityGraph]" = OrderedDict()
+# sync endpoints run on a threadpool: guards get+move_to_end and insert+evict as units
+_GEOCOST_CACHE_LOCK = threading.Lock()
+
+
+def _city_cache_key(city: str, cblob: Dict[str, Any]) -> Optional[str]:
+    try:
+        canon = json.dumps([city, cblob], sort_keys=True, separators=(",", ":"), default=str)
+    except (TypeError, ValueError):
+        return None  # unhashable shape -> just don't cache
+    return hashlib.blake2b(canon.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _geocost_for_city(city: str, cblob: Dict[str, Any]) -> Dict[str, Any]:
+    """Cached compact graph -> freshly emitted blob, so callers may mutate their copy."""
+    key = _city_cache_key(city, cblob)
+    g = None
+    if key is not None:
+        with _GEOCOST_CACHE_LOCK:
+            g = _GEOCOST_CACHE.get(key)
+            if g is not None:
+                _GEOCOST_CACHE.move_to_end(key)
+    if g is None:
+        # assembled outside the lock; two threads racing on one key just both build it
+        g = _assemble_city(city, cblob)
+        if key is not None and GEOCOST_CACHE_SIZE > 0:
+            with _GEOCOST_CACHE_LOCK:
+                _GEOCOST_CACHE[key] = g
+                while len(_GEOCOST_CACHE) > GEOCOST_CACHE_SIZE:
+                    _GEOCOST_CACHE.popitem(last=False)
+    return _emit_city(g)
+
 # ------------------- Main node -------------------
 
 def geocost_assembler(state: AppState) -> AppState:
@@ -243,142 +503,9 @@ def geocost_assembler(state: AppState) -> AppState:
 
     for city in cities:
         cblob = (disc["cities"] or {}).get(city) or {}
-        pois  = cblob.get("pois") or []
-
-        # --- Build nodes ---
-        nodes: List[Dict[str, Any]] = []
-        id_map: Dict[str, int] = {}
-
-        # 0) Hotel (assume city-center hotel; coords optional)
-        hotel = {"id": "H", "type": "hotel", "name": f"{city} Hotel", "open_min": 6*60, "close_min": 23*60, "dwell_min": 0}
-        # pass through centroid as hotel coords if provided
-        cen = _city_centroid(cblob)
-        if cen:
-            hotel.update({"lat": cen[0], "lon": cen[1]})
-        nodes.append(hotel); id_map["H"] = 0
-
-        # 1) POIs
-        for i, p in enumerate(pois, start=1):
-            nm = (p.get("name") or f"POI {i}").strip()
-            open_min, close_min = _poi_window(p)
-            dwell_min = _poi_dwell(p)
-            node = {
-                "id": f"P{i}",
-                "type": "poi",
-                "name": nm,
-                "open_min": open_min,
-                "close_min": close_min,
-                "dwell_min": dwell_min,
-                # pass through coords if present
-                **({ "lat": p.get("lat"), "lon": p.get("lon", p.get("lng")) } if _get_latlon(p) else {}),
-            }
-            nodes.append(node)
-            id_map[node["id"]] = len(nodes) - 1
-
-        # 2) Meals
-        MEAL_SLOTS = [
-            {"id": "MB", "name": "Breakfast", "open_min": 7*60,  "close_min": 10*60+30, "dwell_min": 45},
-            {"id": "ML", "name": "Lunch",     "open_min": 12*60, "close_min": 14*60+30, "dwell_min": 45},
-            {"id": "MD", "name": "Dinner",    "open_min": 18*60, "close_min": 21*60+30, "dwell_min": 45},
-        ]
-        for m in MEAL_SLOTS:
-            node = {
-                "id": m["id"],
-                "type": "meal",
-                "name": m["name"],
-                "open_min": m["open_min"],
-                "close_min": m["close_min"],
-                "dwell_min": m["dwell_min"],
-            }
-            nodes.append(node); id_map[node["id"]] = len(nodes) - 1
-
-        # --- Edge costs/time model ---
-        # Transit marginal cost per edge
-        transit_unit_cost, transit_ccy, _note = _transit_edge_cost_ccy(cblob)
-        base, per_km, per_min, taxi_ccy = _taxi_formula(cblob)
-
-        def edge_payload(A: Dict[str, Any], B: Dict[str, Any]) -> Dict[str, Any]:
-            # Deterministic per-edge speeds + waits
-            edge_key = f"{city}:{A['id']}->{B['id']}"
-            v_walk   = _speed_from_range(WALK_KMH_RANGE,   edge_key+":walk")
-            v_trans  = _speed_from_range(TRANSIT_KMH_RANGE,edge_key+":transit")
-            v_taxi   = _speed_from_range(TAXI_KMH_RANGE,   edge_key+":taxi")
-            t_wait   = _wait_from_range(TRANSIT_WAIT_MIN_RANGE, edge_key+":wait")
-
-            # Meal edges: assume a small local hop (MEAL_LOCAL_KM), not zero
-            if A["type"] == "meal" or B["type"] == "meal":
-                d_km = MEAL_LOCAL_KM
-                walk_min    = _mins_for(d_km, v_walk, 0)
-                transit_min = _mins_for(d_km, v_trans, t_wait)
-                taxi_min    = _mins_for(d_km, v_taxi, 0)
-
-                t_cost = transit_unit_cost or 0.0
-                taxi_total = 0.0
-                if base is not None:    taxi_total += float(base)
-                if per_km is not None:  taxi_total += float(per_km) * float(d_km)
-                if per_min is not None: taxi_total += float(per_min) * float(taxi_min)
-
-                return {
-                    "walk":    {"min": int(walk_min),    "cost": _money(0.0, transit_ccy or taxi_ccy)},
-                    "transit": {"min": int(transit_min), "cost": _money(t_cost, transit_ccy)},
-                    "taxi":    {"min": int(taxi_min),    "cost": _money(round(taxi_total, 2), taxi_ccy)},
-                    "distance_km": round(d_km, 2),
-                    "quality": "assumed_local_meal"
-                }
-
-            # Distance
-            d_km, quality = _pair_distance_km(A, B, cblob, city)
-
-            walk_min    = _mins_for(d_km, v_walk, 0)
-            transit_min = _mins_for(d_km, v_trans, t_wait)
-            taxi_min    = _mins_for(d_km, v_taxi, 0)
-
-            # Transit cost: pass-included or single fare
-            t_cost = transit_unit_cost or 0.0
-
-            # Taxi cost formula
-            taxi_total = 0.0
-            if base is not None:    taxi_total += float(base)
-            if per_km is not None:  taxi_total += float(per_km) * float(d_km)
-            if per_min is not None: taxi_total += float(per_min) * float(taxi_min)
-
-            return {
-                "walk":    {"min": int(walk_min),    "cost": _money(0.0, transit_ccy or taxi_ccy)},
-                "transit": {"min": int(transit_min), "cost": _money(t_cost, transit_ccy)},
-                "taxi":    {"min": int(taxi_min),    "cost": _money(round(taxi_total, 2), taxi_ccy)},
-                "distance_km": round(d_km, 2),
-                "quality": quality
-            }
-
-        # --- Build complete graph edges (undirected; store a<b) ---
-        edges: List[Dict[str, Any]] = []
-        N = len(nodes)
-        for ai in range(N):
-            for bi in range(ai + 1, N):
-                A, B = nodes[ai], nodes[bi]
-                payload = edge_payload(A, B)
-                edges.append({
-                    "a": A["id"], "b": B["id"],
-                    **payload
-                })
-
-        # --- Assemble city geocost ---
-        out[city] = {
-            "nodes": nodes,
-            "edges": edges,
-            "assumptions": {
-                "distance_mode": "haversine/centroid/buckets",
-                "buckets_km": BUCKET_KM,
-                "speed_ranges_kmh": {
-                    "walk": WALK_KMH_RANGE,
-                    "transit": TRANSIT_KMH_RANGE,
-                    "taxi": TAXI_KMH_RANGE,
-                },
-                "transit_wait_min_range": TRANSIT_WAIT_MIN_RANGE,
-                "meal_local_km": MEAL_LOCAL_KM,
-            },
-        }
-        logs.append(f"GeoCost[{city}]: nodes={len(nodes)} edges={len(edges)}; model=speed_ranges;buckets;centroid")
+        g = _geocost_for_city(city, cblob)
+        out[city] = g
+        logs.append(f"GeoCost[{city}]: nodes={len(g['nodes'])} edges={len(g['edges'])}; model=speed_ranges;buckets;centroid")
 
     req["geocost"] = out
     state.request, state.logs = req, logs
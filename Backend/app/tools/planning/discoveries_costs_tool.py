@@ -22,9 +22,16 @@ import math
 from datetime import date, datetime
 from typing import Any, Dict, List, Optional, Tuple
 import re
+from sys import intern  # repeated POI/restaurant names share one str object across cities
 
 from app.tools.tools_utils.state import AppState  # or stub in tests if unavailable
 
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Per-city caps on collected restaurant entries
+_MAX_RESTAURANT_LINKS = 200
+_MAX_RESTAURANT_NAMES = 300
+
 
 # --------------------------- helpers ---------------------------
 
@@ -43,15 +50,6 @@ def _days_between_iso(start: Optional[str], end: Optional[str]) -> int:
     except Exception:
         return 1
 
-def _dedupe(items: List[Dict[str, Any]], key=lambda d: (d.get("name","").strip().lower(), (d.get("url") or "").strip().lower())):
-    seen = set(); out = []
-    for it in items:
-        k = key(it)
-        if k in seen:
-            continue
-        seen.add(k); out.append(it)
-    return out
-
 def _money(amount: Optional[float], currency: Optional[str]) -> Optional[Dict[str, Any]]:
     if amount is None or currency is None:
         return None
@@ -75,8 +73,10 @@ def _coerce_dates(dates_field) -> tuple[Optional[str], Optional[str]]:
         return (start[:10] if isinstance(start, str) else None,
                 end[:10]   if isinstance(end, str)   else None)
     if isinstance(dates_field, str):
+        if len(dates_field) < 10:  # too short to hold even one YYYY-MM-DD
+            return (None, None)
         # grab first two YYYY-MM-DD tokens if present
-        toks = re.findall(r"\d{4}-\d{2}-\d{2}", dates_field)
+        toks = _ISO_DATE_RE.findall(dates_field)
         start = toks[0] if len(toks) >= 1 else None
         end   = toks[1] if len(toks) >= 2 else None
         return (start, end)
@@ -86,39 +86,43 @@ def _coerce_dates(dates_field) -> tuple[Optional[str], Optional[str]]:
 
 # --------------------------- collectors (Discovery_Join) ---------------------------
 
-def _collect_pois(req: Dict[str, Any], city: str) -> List[Dict[str, Any]]:
+def _collect_pois_from_results(poi_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Accepts either:
-      - req["poi_results"][city] = [{name, price?, hours?, sources?}, ...]
-      - OR req["pois_by_city"][city] = ["POI1", ...] (strings or dicts with 'name')
+    req["poi_results"][city] = [{name, price?, hours?, sources?}, ...]
     Normalizes to: [{name, price|null, hours|null, sources:[]}]
     """
     pois_out: List[Dict[str, Any]] = []
-    poi_results = (req.get("poi_results") or {}).get(city)
-    if isinstance(poi_results, list) and poi_results and isinstance(poi_results[0], dict):
-        for p in poi_results:
-            name = (p.get("name") or "").strip()
-            if not name: continue
-            pois_out.append({
-                "name": name,
-                "price": p.get("price"),        # expected Money or None
-                "hours": p.get("hours"),        # keep as-is if present
-                "sources": _as_list(p.get("sources"))[:6],
-            })
-    else:
-        for x in _as_list((req.get("pois_by_city") or {}).get(city)):
-            if isinstance(x, str):
-                nm = x.strip()
-            elif isinstance(x, dict) and x.get("name"):
-                nm = str(x["name"]).strip()
-            else:
-                continue
-            if nm:
-                pois_out.append({"name": nm, "price": None, "hours": None, "sources": []})
+    for p in poi_results:
+        name = (p.get("name") or "").strip()
+        if not name: continue
+        pois_out.append({
+            "name": intern(name),
+            "price": p.get("price"),        # expected Money or None
+            "hours": p.get("hours"),        # keep as-is if present
+            "sources": _as_list(p.get("sources"))[:6],
+        })
+    return pois_out
+
+def _collect_pois_from_names(pois_by_city: Any) -> List[Dict[str, Any]]:
+    """
+    req["pois_by_city"][city] = ["POI1", ...] (strings or dicts with 'name')
+    Normalizes to: [{name, price:null, hours:null, sources:[]}]
+    """
+    pois_out: List[Dict[str, Any]] = []
+    for x in _as_list(pois_by_city):
+        if isinstance(x, str):
+            nm = x.strip()
+        elif isinstance(x, dict) and x.get("name"):
+            nm = str(x["name"]).strip()
+        else:
+            continue
+        if nm:
+            pois_out.append({"name": intern(nm), "price": None, "hours": None, "sources": []})
     return pois_out
 
-def _collect_city_fares(req: Dict[str, Any], city: str) -> Dict[str, Any]:
-    fares = (req.get("city_fares") or {}).get(city) or {}
+def _collect_city_fares(fares: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """fares = req["city_fares"][city] (or None)."""
+    fares = fares or {}
     tr = fares.get("transit") or {}
     tx = fares.get("taxi") or {}
     return {
@@ -137,35 +141,53 @@ def _collect_city_fares(req: Dict[str, Any], city: str) -> Dict[str, Any]:
         },
     }
 
-def _collect_restaurants(req: Dict[str, Any], city: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+def _collect_restaurants(links_raw: Optional[Dict[str, Any]],
+                         names_raw: Optional[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
+    Takes the city's slices of req["restaurants"] / req["restaurant_names"].
     Returns (links_list, names_list)
     links_list items: {name,url,near_poi}
     names_list items: {name,url|null,source,near_poi}
     """
-    links_raw = (req.get("restaurants") or {}).get(city) or {}
-    names_raw = (req.get("restaurant_names") or {}).get(city) or {}
+    links_raw = links_raw or {}
+    names_raw = names_raw or {}
 
-    links: List[Dict[str, Any]] = []
+    # normalize + dedupe in one pass: dicts keyed by the dedupe key keep first-seen order;
+    # stop as soon as a cap is reached (later items could only be sliced off anyway)
+    links: Dict[Tuple[str, str], Dict[str, Any]] = {}
     for poi, arr in links_raw.items():
-        for it in _as_list(arr):
+        if len(links) >= _MAX_RESTAURANT_LINKS:
+            break
+        if not isinstance(arr, list):  # _as_list inlined for this per-POI loop
+            continue
+        for it in arr:
             nm = (it.get("name") or "").strip()
             url = (it.get("url") or "").strip()
             if nm and url:
-                links.append({"name": nm, "url": url, "near_poi": poi})
+                k = (nm.lower(), url.lower())
+                if k not in links:
+                    links[k] = {"name": intern(nm), "url": url, "near_poi": poi}
+                    if len(links) >= _MAX_RESTAURANT_LINKS:
+                        break
 
-    names: List[Dict[str, Any]] = []
+    names: Dict[str, Dict[str, Any]] = {}
     for poi, arr in names_raw.items():
-        for it in _as_list(arr):
+        if len(names) >= _MAX_RESTAURANT_NAMES:
+            break
+        if not isinstance(arr, list):
+            continue
+        for it in arr:
             nm = (it.get("name") or "").strip()
             src = (it.get("source") or "").strip()
             url = it.get("url") or None
             if nm and src:
-                names.append({"name": nm, "url": (url or None), "source": src, "near_poi": poi})
+                k = nm.lower()
+                if k not in names:
+                    names[k] = {"name": intern(nm), "url": (url or None), "source": src, "near_poi": poi}
+                    if len(names) >= _MAX_RESTAURANT_NAMES:
+                        break
 
-    links = _dedupe(links)
-    names = _dedupe(names, key=lambda d: d.get("name","").strip().lower())
-    return links[:200], names[:300]
+    return list(links.values()), list(names.values())
 
 
 # --------------------------- Cost_Inference ---------------------------
@@ -180,15 +202,24 @@ def _infer_transit_costs(city_fares: Dict[str, Any], rides_per_day: int, stay_da
     day_amt, day_ccy       = dayp.get("amount"), dayp.get("currency")
     week_amt, week_ccy     = weekp.get("amount"), weekp.get("currency")
 
-    ccy = _first_currency(day_ccy, single_ccy, week_ccy)
+    # _first_currency(day_ccy, single_ccy, week_ccy), unrolled: no varargs tuple / loop per city
+    if isinstance(day_ccy, str) and len(day_ccy) >= 3:
+        ccy = day_ccy.upper()
+    elif isinstance(single_ccy, str) and len(single_ccy) >= 3:
+        ccy = single_ccy.upper()
+    elif isinstance(week_ccy, str) and len(week_ccy) >= 3:
+        ccy = week_ccy.upper()
+    else:
+        ccy = None
 
     # break-even rides for day-pass
     break_even = None
-    if single_amt and day_amt:
-        try:
-            break_even = int(math.ceil(day_amt / single_amt))
-        except Exception:
-            break_even = None
+    if (single_amt and day_amt and isinstance(single_amt, (int, float))
+            and isinstance(day_amt, (int, float))):
+        # true division + ceil on purpose: -(-a // b) disagrees on decimal fares (13.96 / 0.04 -> 350)
+        ratio = day_amt / single_amt
+        if math.isfinite(ratio):
+            break_even = math.ceil(ratio)
 
     # per-day choice (single vs day)
     per_day_cost = None
@@ -227,40 +258,37 @@ def _taxi_estimator(city_fares: Dict[str, Any]) -> Dict[str, Any]:
     base = tx.get("base"); per_km = tx.get("per_km"); per_min = tx.get("per_min")
     ccy = tx.get("currency")
 
-    def _estimate(distance_km: float, minutes: float) -> Optional[Dict[str, Any]]:
-        if base is None and per_km is None and per_min is None:
-            return None
-        total = 0.0
-        if base is not None: total += float(base)
-        if per_km is not None and distance_km is not None: total += float(per_km) * float(distance_km)
-        if per_min is not None and minutes is not None: total += float(per_min) * float(minutes)
-        return _money(round(total, 2), ccy)
-
-    examples = {
-        "short_city_hop": _estimate(3.0, 10.0),  # ~3 km, 10 min
-        "airport_like":   _estimate(25.0, 45.0), # ~25 km, 45 min
-    }
+    if (base is None and per_km is None and per_min is None) or ccy is None:
+        examples = {"short_city_hop": None, "airport_like": None}
+    else:
+        # cast the formula once; leaf Money dicts are built directly (no _money round-trip)
+        b  = float(base)    if base    is not None else 0.0
+        km = float(per_km)  if per_km  is not None else 0.0
+        mn = float(per_min) if per_min is not None else 0.0
+        examples = {
+            "short_city_hop": {"amount": float(round(b + km * 3.0 + mn * 10.0, 2)), "currency": ccy},   # ~3 km, 10 min
+            "airport_like":   {"amount": float(round(b + km * 25.0 + mn * 45.0, 2)), "currency": ccy},  # ~25 km, 45 min
+        }
 
     return {
         "formula": {"base": base, "per_km": per_km, "per_min": per_min, "currency": ccy},
         "examples": examples,
     }
 
-def _poi_entry_costs(pois: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    out = []
-    for p in pois:
-        out.append({
-            "name": p.get("name"),
-            "entry": p.get("price") or None,   # expect Money or None from POI node
-        })
-    return out
+def _poi_entry_costs(pois: List[Dict[str, Any]], include_unpriced: bool = False) -> List[Dict[str, Any]]:
+    # Consumers treat a missing name like entry=None, so unpriced POIs are
+    # skipped by default instead of emitting {"entry": None} rows.
+    if include_unpriced:
+        return [{"name": p.get("name"), "entry": p.get("price") or None} for p in pois]
+    return [{"name": p.get("name"), "entry": p["price"]} for p in pois if p.get("price")]
 
-def _lodging_placeholder(req: Dict[str, Any], city: str, nights: int) -> Dict[str, Any]:
+def _lodging_placeholder(per_city: Optional[Dict[str, Any]], transit: Dict[str, Any], nights: int) -> Dict[str, Any]:
     """
     Uses (optional) request.lodging.per_city[city] as Money; else falls back to a default.
-    The default currency tries to inherit from transit currency for the city.
+    The default currency tries to inherit from transit currency for the city
+    (transit = the normalized _collect_city_fares(...)["transit"]).
     """
-    per_city = ((req.get("lodging") or {}).get("per_city") or {}).get(city) or {}
+    per_city = per_city or {}
     amt = per_city.get("amount"); ccy = per_city.get("currency")
 
     if amt is None:
@@ -269,11 +297,10 @@ def _lodging_placeholder(req: Dict[str, Any], city: str, nights: int) -> Dict[st
         amt = 120.0
     if not ccy:
         # try to inherit currency from fares if available
-        tr = ((req.get("city_fares") or {}).get(city) or {}).get("transit") or {}
         ccy = _first_currency(
-            (tr.get("single") or {}).get("currency"),
-            (tr.get("day_pass") or {}).get("currency"),
-            (tr.get("weekly_pass") or {}).get("currency"),
+            (transit["single"] or {}).get("currency"),
+            (transit["day_pass"] or {}).get("currency"),
+            (transit["weekly_pass"] or {}).get("currency"),
         ) or "USD"
 
     return {
@@ -319,20 +346,22 @@ def discovery_and_cost(state: AppState) -> AppState:
         "hops": <copy of intercity>
       }
     """
-    req, logs = state.request, state.logs or []
+    if state.logs is None:
+        state.logs = []
+    req, logs = state.request, state.logs  # appended in place; no write-back needed
     state.meta = state.meta or {}
     
     # Defensive check: ensure req is a dictionary
     if not isinstance(req, dict):
         print(f"[ERROR] discoveries_costs_tool - state.request is not a dict, it's {type(req)}: {req}")
         state.meta["error"] = f"Expected dict but got {type(req)}"
-        state.logs = logs; return state
+        return state
 
     cities = req.get("cities") or []
     # print(f"this is cities: {cities}")
     if not cities:
         state.meta["requires_input"] = {"field": "cities", "message": "No cities provided"}
-        state.logs = logs; return state
+        return state
 
     start, end = _coerce_dates(req.get("dates"))
     # print(f"this is start: {start}")
@@ -342,15 +371,48 @@ def discovery_and_cost(state: AppState) -> AppState:
 
     out: Dict[str, Any] = {"cities": {}, "hops": (req.get("intercity") or {})}
 
+    # Per-request sources, resolved once; collectors get each city's slice
+    poi_results_all  = req.get("poi_results") or {}
+    pois_by_city_all = req.get("pois_by_city") or {}
+    city_fares_all   = req.get("city_fares") or {}
+    restaurants_all  = req.get("restaurants") or {}
+    names_all        = req.get("restaurant_names") or {}
+    lodging_per_city = (req.get("lodging") or {}).get("per_city") or {}
+
+    # Cities with identical fare shapes (e.g. same country) share one computed result;
+    # the results are read-only downstream, so the same dict is referenced per city.
+    transit_cache: Dict[tuple, Dict[str, Any]] = {}
+    taxi_cache: Dict[tuple, Dict[str, Any]] = {}
+
     for city in cities:
-        pois = _collect_pois(req, city)
-        fares = _collect_city_fares(req, city)
-        links, names = _collect_restaurants(req, city)
+        # pick the POI source once per city; poi_results wins when it holds dicts
+        poi_results = poi_results_all.get(city)
+        if isinstance(poi_results, list) and poi_results and isinstance(poi_results[0], dict):
+            pois = _collect_pois_from_results(poi_results)
+        else:
+            pois = _collect_pois_from_names(pois_by_city_all.get(city))
+        fares = _collect_city_fares(city_fares_all.get(city))
+        links, names = _collect_restaurants(restaurants_all.get(city), names_all.get(city))
 
         # cost inference
-        transit_costs = _infer_transit_costs(fares, rides_per_day=rides_per_day, stay_days=nights)
-        taxi_costs    = _taxi_estimator(fares)
-        lodging_costs = _lodging_placeholder(req, city, nights=nights)
+        tr, tx = fares["transit"], fares["taxi"]
+        sg, dp, wp = tr["single"] or {}, tr["day_pass"] or {}, tr["weekly_pass"] or {}
+        tkey = (sg.get("amount"), sg.get("currency"), dp.get("amount"), dp.get("currency"),
+                wp.get("amount"), wp.get("currency"))
+        xkey = (tx["base"], tx["per_km"], tx["per_min"], tx["currency"])
+        try:
+            transit_costs, taxi_costs = transit_cache.get(tkey), taxi_cache.get(xkey)
+        except TypeError:  # unhashable upstream value -> just compute, don't cache
+            tkey = xkey = transit_costs = taxi_costs = None
+        if transit_costs is None:
+            transit_costs = _infer_transit_costs(fares, rides_per_day=rides_per_day, stay_days=nights)
+            if tkey is not None:
+                transit_cache[tkey] = transit_costs
+        if taxi_costs is None:
+            taxi_costs = _taxi_estimator(fares)
+            if xkey is not None:
+                taxi_cache[xkey] = taxi_costs
+        lodging_costs = _lodging_placeholder(lodging_per_city.get(city), fares["transit"], nights=nights)
         poi_costs     = _poi_entry_costs(pois)
 
         out["cities"][city] = {
@@ -371,7 +433,6 @@ def discovery_and_cost(state: AppState) -> AppState:
         )
 
     req["discovery"] = out
-    state.request, state.logs = req, logs
     return state
 
 
@@ -17,6 +17,7 @@ while considering practical constraints like travel time and opening hours.
 """
 
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -71,12 +72,26 @@ def _m_amt(m: Optional[Dict[str, Any]]) -> Optional[float]:
         return None
 
 
-def _edge_key(a: str, b: str) -> Tuple[str, str]:
-    return (a, b) if a < b else (b, a)
+def _index_nodes(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], hotel_id: str) -> Dict[str, int]:
+    """Dense integer id per node (plus the hotel and any id only seen on an edge)."""
+    idx: Dict[str, int] = {}
+    for n in nodes:
+        idx.setdefault(n["id"], len(idx))
+    idx.setdefault(hotel_id, len(idx))
+    for e in edges:
+        idx.setdefault(e["a"], len(idx))
+        idx.setdefault(e["b"], len(idx))
+    return idx
 
 
-def _build_edge_map(edges: List[Dict[str, Any]]) -> Dict[Tuple[str,str], Dict[str, Any]]:
-    return {_edge_key(e["a"], e["b"]): e for e in edges}
+def _build_edge_grid(edges: List[Dict[str, Any]], idx: Dict[str, int]) -> List[List[Optional[Dict[str, Any]]]]:
+    """N x N symmetric edge table indexed by node position (None = no edge; last duplicate wins)."""
+    n = len(idx)
+    grid: List[List[Optional[Dict[str, Any]]]] = [[None] * n for _ in range(n)]
+    for e in edges:
+        i, j = idx[e["a"]], idx[e["b"]]
+        grid[i][j] = grid[j][i] = e
+    return grid
 
 
 def _choose_mode(e: Dict[str, Any]) -> Tuple[str, int, Optional[Dict[str, Any]]]:
@@ -126,8 +141,8 @@ def _choose_mode(e: Dict[str, Any]) -> Tuple[str, int, Optional[Dict[str, Any]]]
     return ("transit", t, tc)
 
 
-def _edge_payload(edge_map, a_id: str, b_id: str) -> Tuple[str, int, Optional[Dict[str, Any]], Dict[str, Any]]:
-    e = edge_map.get(_edge_key(a_id, b_id))
+def _edge_payload(edge_grid, a: int, b: int) -> Tuple[str, int, Optional[Dict[str, Any]], Dict[str, Any]]:
+    e = edge_grid[a][b]
     if not e:
         # no edge (shouldn't happen with complete graph) — vary fallback to avoid identical durations
         fake = {"walk": {"min": 12, "cost": {"amount": 0.0, "currency": "USD"}},
@@ -180,24 +195,56 @@ def itinerary_optimizer_greedy(state: AppState) -> AppState:
     for city, g in geocost.items():
         nodes: List[Dict[str, Any]] = g.get("nodes", [])
         edges: List[Dict[str, Any]] = g.get("edges", [])
-        edge_map = _build_edge_map(edges)
 
-        # index nodes
+        # index nodes: dense ids, an N x N edge table and POI window/dwell columns
         by_id = {n["id"]: n for n in nodes}
         hotel_id = "H"
+        idx = _index_nodes(nodes, edges, hotel_id)
+        ids = list(idx)
+        edge_grid = _build_edge_grid(edges, idx)
+        # _edge_payload per node pair, filled on first use (edges are undirected)
+        payloads: List[List[Optional[tuple]]] = [[None] * len(ids) for _ in ids]
+
+        def edge(a: int, b: int) -> Tuple[str, int, Optional[Dict[str, Any]], Dict[str, Any]]:
+            p = payloads[a][b]
+            if p is None:
+                p = payloads[a][b] = payloads[b][a] = _edge_payload(edge_grid, a, b)
+            return p
+
+        hotel = idx[hotel_id]
         poi_ids = [n["id"] for n in nodes if n.get("type") == "poi"]
         meal_ids = [n["id"] for n in nodes if n.get("type") == "meal"]
 
-        # sort POIs by (earlier close, then name) to bias greediness
-        poi_ids.sort(key=lambda nid: (int(by_id[nid].get("close_min", 18*60)), by_id[nid].get("name","")))
+        open_arr, close_arr, dwell_arr = array("i", [0] * len(ids)), array("i", [0] * len(ids)), array("i", [0] * len(ids))
+        for nid in poi_ids:
+            n, i = by_id[nid], idx[nid]
+            open_arr[i] = int(n.get("open_min", 9*60))
+            close_arr[i] = int(n.get("close_min", 18*60))
+            dwell_arr[i] = int(n.get("dwell_min", 60))
+
+        # Latest feasible start per POI: closing time and the trip back to the hotel
+        # before DAY_END_MIN folded into one bound, so each candidate is a single compare
+        last_start = array("i", [0] * len(ids))
+        for nid in poi_ids:
+            i = idx[nid]
+            t_back = edge(i, hotel)[1]
+            last_start[i] = min(close_arr[i], DAY_END_MIN - t_back) - dwell_arr[i]
 
-        # prepare meal windows
-        meal_info = {mid: (int(by_id[mid]["open_min"]), int(by_id[mid]["close_min"]), int(by_id[mid]["dwell_min"])) for mid in meal_ids}
+        # sort POIs by (earlier close, then name) to bias greediness
+        poi_ids.sort(key=lambda nid: (close_arr[idx[nid]], by_id[nid].get("name","")))
+
+        # prepare meal windows in the shared node columns (meal slots always carry them; no defaults)
+        meal_idx: Dict[str, int] = {}
+        for mid in meal_ids:
+            n, i = by_id[mid], idx[mid]
+            open_arr[i], close_arr[i], dwell_arr[i] = int(n["open_min"]), int(n["close_min"]), int(n["dwell_min"])
+            meal_idx[mid] = i
+        ml = meal_idx.get("ML")
         # fixed order for meals we try to include each day
         meal_order = [mid for mid in ("MB","ML","MD") if mid in meal_ids]
 
         # tracking
-        remaining_pois = set(poi_ids)
+        remaining_pois = [idx[nid] for nid in dict.fromkeys(poi_ids)]  # unvisited, in bias order
         day_cards: List[Dict[str, Any]] = []
 
         for day in range(1, max(1, days_total) + 1):
@@ -206,7 +253,7 @@ def itinerary_optimizer_greedy(state: AppState) -> AppState:
 
             day_start = DAY_START_MIN
             day_end   = DAY_END_MIN
-            cur_id    = hotel_id
+            cur       = hotel
             cur_time  = day_start
             used_meals = set()
             used_pois  = 0
@@ -215,115 +262,109 @@ def itinerary_optimizer_greedy(state: AppState) -> AppState:
             travel_cost_total: Optional[Dict[str, Any]] = None
 
             # Try to schedule breakfast immediately if feasible
-            if "MB" in meal_info and "MB" not in used_meals:
-                mb_open, mb_close, mb_dwell = meal_info["MB"]
+            if "MB" in meal_idx and "MB" not in used_meals:
+                mb = meal_idx["MB"]
+                mb_open, mb_close, mb_dwell = open_arr[mb], close_arr[mb], dwell_arr[mb]
                 # travel from hotel to MB
-                mode, tmin, cost, _ = _edge_payload(edge_map, cur_id, "MB")
+                mode, tmin, cost, _ = edge(cur, mb)
                 arr = cur_time + tmin
                 start = _first_feasible_start(arr, mb_dwell, mb_open, mb_close)
                 if start is not None and (start + mb_dwell) <= day_end:
                     items.append({
                         "node_id": "MB", "type": "meal", "name": by_id["MB"]["name"],
-                        "from_id": cur_id, "mode": mode, "travel_min": tmin, "travel_cost": cost,
+                        "from_id": ids[cur], "mode": mode, "travel_min": tmin, "travel_cost": cost,
                         "arrive_min": arr, "start_min": start, "end_min": start + mb_dwell
                     })
                     travel_cost_total = _money_add(travel_cost_total, cost)
-                    cur_id, cur_time = "MB", start + mb_dwell
+                    cur, cur_time = mb, start + mb_dwell
                     used_meals.add("MB")
 
             def maybe_schedule_meal(mid: str) -> bool:
-                nonlocal cur_id, cur_time, travel_cost_total
-                if mid not in meal_info or mid in used_meals:
+                nonlocal cur, cur_time, travel_cost_total
+                if mid not in meal_idx or mid in used_meals:
                     return False
-                open_m, close_m, dwell_m = meal_info[mid]
-                mode, tmin, cost, _ = _edge_payload(edge_map, cur_id, mid)
+                mi = meal_idx[mid]
+                open_m, close_m, dwell_m = open_arr[mi], close_arr[mi], dwell_arr[mi]
+                mode, tmin, cost, _ = edge(cur, mi)
                 arr = cur_time + tmin
                 start = _first_feasible_start(arr, dwell_m, open_m, close_m)
                 if start is None or (start + dwell_m) > day_end:
                     return False
                 # Also check we can still return to hotel after meal
-                mode_back, t_back, _c_back, _ = _edge_payload(edge_map, mid, hotel_id)
+                mode_back, t_back, _c_back, _ = edge(mi, hotel)
                 if start + dwell_m + t_back > day_end:
                     return False
                 items.append({
                     "node_id": mid, "type": "meal", "name": by_id[mid]["name"],
-                    "from_id": cur_id, "mode": mode, "travel_min": tmin, "travel_cost": cost,
+                    "from_id": ids[cur], "mode": mode, "travel_min": tmin, "travel_cost": cost,
                     "arrive_min": arr, "start_min": start, "end_min": start + dwell_m
                 })
                 travel_cost_total = _money_add(travel_cost_total, cost)
-                cur_id, cur_time = mid, start + dwell_m
+                cur, cur_time = mi, start + dwell_m
                 used_meals.add(mid)
                 return True
 
             # Greedy POI fill
             while used_pois < MAX_POIS_PER_DAY and remaining_pois:
                 # If we're around lunchtime and not yet taken, attempt ML first
-                if "ML" in meal_info and "ML" not in used_meals and cur_time >= meal_info["ML"][0] - 20 and cur_time <= meal_info["ML"][1]:
+                if ml is not None and "ML" not in used_meals and cur_time >= open_arr[ml] - 20 and cur_time <= close_arr[ml]:
                     maybe_schedule_meal("ML")
 
                 # Evaluate candidates
                 best = None  # (finish_time, travel_min, start_time, next_id, mode, cost)
-                for nid in list(remaining_pois):
-                    n = by_id[nid]
-                    dwell = int(n.get("dwell_min", 60))
-                    open_m = int(n.get("open_min", 9*60))
-                    close_m = int(n.get("close_min", 18*60))
-
-                    mode, tmin, cost, _ = _edge_payload(edge_map, cur_id, nid)
-                    arr = cur_time + tmin
-                    start = _first_feasible_start(arr, dwell, open_m, close_m)
-                    if start is None:
-                        continue
-                    endv = start + dwell
-
-                    # ensure return to hotel is possible after visiting
-                    mode_back, t_back, _c_back, _ = _edge_payload(edge_map, nid, hotel_id)
-                    if endv + t_back > day_end:
+                row = payloads[cur]
+                for i in remaining_pois:
+                    mode, tmin, cost, _ = row[i] or edge(cur, i)
+                    # wait until open; must still close out the visit and return to hotel in time
+                    start = max(cur_time + tmin, open_arr[i])
+                    if start > last_start[i]:
                         continue
 
                     # pick the one with minimal travel time (tmin); tie-break earlier close
-                    cand = (endv, tmin, start, nid, mode, cost, close_m)
+                    close_m = close_arr[i]
+                    cand = (start + dwell_arr[i], tmin, start, i, mode, cost, close_m)
                     if (best is None) or (tmin < best[1]) or (tmin == best[1] and close_m < best[6]):
                         best = cand
 
                 if not best:
                     break  # nothing feasible
 
-                endv, tmin, start, nid, mode, cost, _close = best
+                endv, tmin, start, i, mode, cost, _close = best
+                nid = ids[i]
                 # commit the POI
                 items.append({
                     "node_id": nid, "type": "poi", "name": by_id[nid]["name"],
-                    "from_id": cur_id, "mode": mode, "travel_min": tmin, "travel_cost": cost,
+                    "from_id": ids[cur], "mode": mode, "travel_min": tmin, "travel_cost": cost,
                     "arrive_min": cur_time + tmin, "start_min": start, "end_min": endv
                 })
                 travel_cost_total = _money_add(travel_cost_total, cost)
-                cur_id, cur_time = nid, endv
-                remaining_pois.discard(nid)
+                cur, cur_time = i, endv
+                remaining_pois.remove(i)
                 used_pois += 1
 
                 # opportunistic lunch if we just crossed noon
-                if "ML" in meal_info and "ML" not in used_meals and cur_time < day_end:
+                if ml is not None and "ML" not in used_meals and cur_time < day_end:
                     maybe_schedule_meal("ML")
 
                 # Stop if next addition obviously cannot fit (guard)
-                mode_back, t_back, _c_back, _ = _edge_payload(edge_map, cur_id, hotel_id)
+                mode_back, t_back, _c_back, _ = edge(cur, hotel)
                 if cur_time + t_back > day_end:
                     break
 
             # Try to add dinner before going back
-            if "MD" in meal_info and "MD" not in used_meals:
+            if "MD" in meal_idx and "MD" not in used_meals:
                 maybe_schedule_meal("MD")
 
             # Return to hotel
-            mode_back, t_back, c_back, _ = _edge_payload(edge_map, cur_id, hotel_id)
-            if cur_id != hotel_id and cur_time + t_back <= day_end:
+            mode_back, t_back, c_back, _ = edge(cur, hotel)
+            if cur != hotel and cur_time + t_back <= day_end:
                 items.append({
                     "node_id": hotel_id, "type": "hotel", "name": "Hotel return",
-                    "from_id": cur_id, "mode": mode_back, "travel_min": t_back, "travel_cost": c_back,
+                    "from_id": ids[cur], "mode": mode_back, "travel_min": t_back, "travel_cost": c_back,
                     "arrive_min": cur_time + t_back, "start_min": cur_time + t_back, "end_min": cur_time + t_back
                 })
                 travel_cost_total = _money_add(travel_cost_total, c_back)
-                cur_id, cur_time = hotel_id, cur_time + t_back
+                cur, cur_time = hotel, cur_time + t_back
 
             day_cards.append({
                 "day": day,
@@ -18,78 +18,141 @@ essential for multi-city trip planning and budget optimization.
 
 from __future__ import annotations
 
-import os, re, time
+import os, re, time, json, hashlib, threading, atexit
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache
 
 from pydantic import BaseModel, Field, field_validator
 from tavily import TavilyClient
 
+try:
+    import regex as _rx  # optional: faster engine for the duration/price scanners below
+except ImportError:
+    _rx = re
+
+try:  # requests/urllib3 come with tavily-python; only used to size its HTTP pool
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    HTTPAdapter = None
+    Retry = None
+
 # ===================== Global speed knobs (ENV) =====================
 INTERCITY_SEARCH_DEPTH      = os.getenv("INTERCITY_SEARCH_DEPTH", "basic")  # "basic" | "advanced"
 INTERCITY_INCLUDE_RAW       = os.getenv("INTERCITY_INCLUDE_RAW", "false").lower() == "true"
-INTERCITY_QUERY_WORKERS     = int(os.getenv("INTERCITY_QUERY_WORKERS", "4"))   # per-mode variant fan-out
-INTERCITY_HOP_WORKERS       = int(os.getenv("INTERCITY_HOP_WORKERS", "6"))     # across hops
+INTERCITY_HOP_WORKERS       = int(os.getenv("INTERCITY_HOP_WORKERS", "6"))     # default args.max_workers: per-call cap on in-flight searches
+INTERCITY_POOL_WORKERS      = int(os.getenv("INTERCITY_POOL", "32"))           # shared search pool: all hops x modes x variants
+# flight first; rail/bus only searched for hops that are not long-haul (saves ~2/3 of the
+# calls on long hops, costs one extra search round-trip on short ones)
+INTERCITY_SKIP_LONGHAUL_SEARCHES = os.getenv("INTERCITY_SKIP_LONGHAUL_SEARCHES", "false").lower() == "true"
+# one OR-joined query per mode instead of one search per preference variant (fewer calls/credits)
+INTERCITY_BATCH_MODE_QUERIES = os.getenv("INTERCITY_BATCH_MODE_QUERIES", "false").lower() == "true"
+# stop waiting on a mode's remaining variants once its answers already give duration + price
+INTERCITY_EARLY_EXIT = os.getenv("INTERCITY_EARLY_EXIT", "false").lower() == "true"
 INTERCITY_RESULTS_PER_QUERY = int(os.getenv("INTERCITY_RESULTS_PER_QUERY", "3"))
+INTERCITY_HTTP_POOL         = int(os.getenv("INTERCITY_HTTP_POOL", "32"))      # keep-alive conns to Tavily
+INTERCITY_PARSE_CACHE       = int(os.getenv("INTERCITY_PARSE_CACHE", "256"))   # memoized answer/blob parses
+INTERCITY_CACHE_DIR         = os.getenv("INTERCITY_CACHE_DIR", "/tmp/intercity")  # "" disables the disk layer
+INTERCITY_CACHE_TTL_SEC     = int(os.getenv("INTERCITY_CACHE_TTL_SEC", "1800"))   # fares move; keep it short
+INTERCITY_CACHE_MAX         = int(os.getenv("INTERCITY_CACHE_MAX", "2048"))       # in-process entries
 
 # ===================== duration parsing (tiny & robust) =====================
 _HOUR_WORDS = r"(?:hours?|hrs?|hr)"
 _MIN_WORDS  = r"(?:minutes?|mins?|min)"
 
+# callers match against lower-cased text, so no re.I: literal units scan faster case-sensitive
 _PATTERNS_DUR = {
-    "HM_words":   re.compile(rf"(?<!\d)(\d{{1,2}})\s*{_HOUR_WORDS}\s*(?:and\s*)?(\d{{1,2}})\s*{_MIN_WORDS}\b", re.I),
-    "HM_compact": re.compile(r"(?<!\d)(\d{1,2})\s*h\s*(\d{1,2})\s*m\b", re.I),
-    "HM_sticky":  re.compile(r"(?<!\d)(\d{1,2})h(\d{1,2})\b", re.I),
-    "H_words_dec":re.compile(rf"(?<!\d)(\d{{1,2}}(?:[.,]\d+)?)\s*{_HOUR_WORDS}\b", re.I),
-    "H_compact":  re.compile(r"(?<!\d)(\d{1,2})\s*h(?![a-z])\b", re.I),
-    "M_words":    re.compile(rf"(?<!\d)(\d{{1,3}})\s*{_MIN_WORDS}\b", re.I),
-    "M_compact":  re.compile(r"(?<!\d)(\d{1,3})\s*m(?![a-z])\b", re.I),
-    "H_colon_M":  re.compile(r"(?<!\d)(\d{1,2})\s*:\s*(\d{2})\s*h\b", re.I),
+    "HM_words":   _rx.compile(rf"(?<!\d)(\d{{1,2}})\s*{_HOUR_WORDS}\s*(?:and\s*)?(\d{{1,2}})\s*{_MIN_WORDS}\b"),
+    "HM_compact": _rx.compile(r"(?<!\d)(\d{1,2})\s*h\s*(\d{1,2})\s*m\b"),
+    "HM_sticky":  _rx.compile(r"(?<!\d)(\d{1,2})h(\d{1,2})\b"),
+    "H_words_dec":_rx.compile(rf"(?<!\d)(\d{{1,2}}(?:[.,]\d+)?)\s*{_HOUR_WORDS}\b"),
+    "H_compact":  _rx.compile(r"(?<!\d)(\d{1,2})\s*h(?![a-z])\b"),
+    "M_words":    _rx.compile(rf"(?<!\d)(\d{{1,3}})\s*{_MIN_WORDS}\b"),
+    "M_compact":  _rx.compile(r"(?<!\d)(\d{1,3})\s*m(?![a-z])\b"),
+    "H_colon_M":  _rx.compile(r"(?<!\d)(\d{1,2})\s*:\s*(\d{2})\s*h\b"),
 }
 
-def _gather_minutes(text: str) -> Tuple[List[int], List[int], List[int]]:
+_NO_DIGIT_BEFORE = r"(?<!\d)"
+
+def _dur_scanners(*names: str) -> "Tuple[re.Pattern[str], ...]":
+    # Every duration pattern opens with (?<!\d)\d; a (?=\d) lookahead in front
+    # lets sre jump from digit to digit instead of trying the guard everywhere.
+    # Patterns stay separate scans: fused into one alternation, a match from one
+    # pattern would consume text another pattern matches with a different value.
+    out = []
+    for n in names:
+        pat = _PATTERNS_DUR[n].pattern
+        if not pat.startswith(_NO_DIGIT_BEFORE):
+            raise ValueError(f"duration pattern {n!r} must start with {_NO_DIGIT_BEFORE}")
+        out.append(_rx.compile(rf"(?=\d){pat}"))
+    return tuple(out)
+
+_DUR_HM = _dur_scanners("HM_words", "HM_compact", "HM_sticky", "H_colon_M")
+_DUR_H  = _dur_scanners("H_words_dec", "H_compact")
+_DUR_M  = _dur_scanners("M_words", "M_compact")
+
+def _gather_minutes(text: str, early_exit: bool = False) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Valid (10 min .. 24 h) durations per bucket: (hours+minutes, hours-only, minutes-only).
+    early_exit=True stops at the first bucket with a valid hit; the later buckets come
+    back empty (callers that only want the best duration never look at them).
+    """
     if not text: return [], [], []
-    hm: List[int] = []; hh: List[int] = []; mm: List[int] = []
+    text = text.lower()  # once for all buckets (patterns are lower-case, no re.I)
+    ok = lambda x: 10 <= x <= 24*60
 
-    for pat in ("HM_words","HM_compact","HM_sticky","H_colon_M"):
-        for m in _PATTERNS_DUR[pat].finditer(text):
+    hm: List[int] = []
+    for pat in _DUR_HM:
+        for m in pat.finditer(text):
             hm.append(int(m.group(1))*60 + int(m.group(2)))
-
-    for m in _PATTERNS_DUR["H_words_dec"].finditer(text):
-        val = float(m.group(1).replace(",", "."))
-        hh.append(int(round(val * 60)))
-    for m in _PATTERNS_DUR["H_compact"].finditer(text):
-        hh.append(int(m.group(1)) * 60)
-
-    for pat in ("M_words","M_compact"):
-        for m in _PATTERNS_DUR[pat].finditer(text):
+    hm = [x for x in hm if ok(x)]
+    if early_exit and hm:
+        return hm, [], []
+
+    hh: List[int] = []
+    for pat in _DUR_H:
+        for m in pat.finditer(text):
+            val = float(m.group(1).replace(",", "."))
+            hh.append(int(round(val * 60)))
+    hh = [x for x in hh if ok(x)]
+    if early_exit and hh:
+        return hm, hh, []
+
+    mm: List[int] = []
+    for pat in _DUR_M:
+        for m in pat.finditer(text):
             mm.append(int(m.group(1)))
+    return hm, hh, [x for x in mm if ok(x)]
 
-    ok = lambda x: 10 <= x <= 24*60
-    return [x for x in hm if ok(x)], [x for x in hh if ok(x)], [x for x in mm if ok(x)]
-
+@lru_cache(maxsize=INTERCITY_PARSE_CACHE)
 def _parse_best_duration_minutes(text: str) -> Optional[int]:
-    HM, H, M = _gather_minutes(text or "")
+    # priority HM > H > M, so buckets after the first non-empty one needn't be scanned
+    HM, H, M = _gather_minutes(text or "", early_exit=True)
     if HM: return min(HM)
     if H:  return min(H)
     if M:  return min(M)
     return None
 
 # ===================== price parsing (site-agnostic) =====================
-_SYM = {"€":"EUR","£":"GBP","¥":"JPY","₩":"KRW","₪":"ILS","₺":"TRY","₽":"RUB"}
-_ISO_WORDS = {"usd":"USD","eur":"EUR","gbp":"GBP","jpy":"JPY","cad":"CAD","aud":"AUD",
-              "nzd":"NZD","chf":"CHF","cny":"CNY","inr":"INR","try":"TRY","ils":"ILS","sgd":"SGD"}
-_WORDS = {"euro":"EUR","euros":"EUR","pound":"GBP","pounds":"GBP","dollar":"USD","dollars":"USD",
-          "yen":"JPY","shekel":"ILS","shekels":"ILS","rupee":"INR","rupees":"INR"}
+# read-only currency lookups (constant; shared by all hop threads)
+_SYM = MappingProxyType({"€":"EUR","£":"GBP","¥":"JPY","₩":"KRW","₪":"ILS","₺":"TRY","₽":"RUB"})
+_ISO_WORDS = MappingProxyType({"usd":"USD","eur":"EUR","gbp":"GBP","jpy":"JPY","cad":"CAD","aud":"AUD",
+              "nzd":"NZD","chf":"CHF","cny":"CNY","inr":"INR","try":"TRY","ils":"ILS","sgd":"SGD"})
+_WORDS = MappingProxyType({"euro":"EUR","euros":"EUR","pound":"GBP","pounds":"GBP","dollar":"USD","dollars":"USD",
+          "yen":"JPY","shekel":"ILS","shekels":"ILS","rupee":"INR","rupees":"INR"})
 
 _PATTERNS_PRICE = {
-    "symbol": re.compile(r"(?:(C\$|A\$)|([$€£¥₩₪₺₽]))\s?(\d{1,7}(?:[.,]\d{1,2})?)"),
-    "iso_pre": re.compile(r"\b([A-Z]{3})\s?(\d{1,7}(?:[.,]\d{1,2})?)\b"),
-    "word_after": re.compile(r"(\d{1,7}(?:[.,]\d{1,2})?)\s*(euros?|pounds?|dollars?|yen|shekels?|rupees?)", re.I),
-    "iso_after": re.compile(r"(\d{1,7}(?:[.,]\d{1,2})?)\s*(usd|eur|gbp|jpy|cad|aud|nzd|chf|cny|inr|try|ils|sgd)\b", re.I),
+    "symbol": _rx.compile(r"(?:(C\$|A\$)|([$€£¥₩₪₺₽]))\s?(\d{1,7}(?:[.,]\d{1,2})?)"),
+    "iso_pre": _rx.compile(r"\b([A-Z]{3})\s?(\d{1,7}(?:[.,]\d{1,2})?)\b"),
+    # the two "after" patterns run on lower-cased text (see _gather_prices), so no re.I
+    "word_after": _rx.compile(r"(\d{1,7}(?:[.,]\d{1,2})?)\s*(euros?|pounds?|dollars?|yen|shekels?|rupees?)"),
+    "iso_after": _rx.compile(r"(\d{1,7}(?:[.,]\d{1,2})?)\s*(usd|eur|gbp|jpy|cad|aud|nzd|chf|cny|inr|try|ils|sgd)\b"),
 }
-_THOUSANDS_GROUP = re.compile(r"^\d{1,3}(?:,\d{3})+$")
+_THOUSANDS_GROUP = _rx.compile(r"^\d{1,3}(?:,\d{3})+$")
 
+@lru_cache(maxsize=1024)  # amounts repeat a lot across snippets ("29.90", "45", ...)
 def _to_float(num: str) -> float:
     s = num.strip()
     if "," in s and "." in s:
@@ -121,29 +184,44 @@ def _gather_prices(text: str, default_dollar: str) -> List[Tuple[float,str]]:
     for m in _PATTERNS_PRICE["iso_pre"].finditer(text):
         out.append((_to_float(m.group(2)), m.group(1).upper()))
 
-    for m in _PATTERNS_PRICE["word_after"].finditer(text):
-        ccy = _WORDS.get(m.group(2).lower(), None) or default_dollar
+    # symbol / iso_pre are case-sensitive ("C$", "EUR 12") and keep the original text
+    lo = text.lower()
+    for m in _PATTERNS_PRICE["word_after"].finditer(lo):
+        ccy = _WORDS.get(m.group(2), None) or default_dollar
         out.append((_to_float(m.group(1)), ccy))
 
-    for m in _PATTERNS_PRICE["iso_after"].finditer(text):
-        out.append((_to_float(m.group(1)), _ISO_WORDS[m.group(2).lower()]))
+    for m in _PATTERNS_PRICE["iso_after"].finditer(lo):
+        out.append((_to_float(m.group(1)), _ISO_WORDS[m.group(2)]))
 
     return [(a,c) for (a,c) in out if a >= 1]
 
-def _parse_lowest_price(text: str, default_dollar: str) -> Optional[Dict[str, Any]]:
+@lru_cache(maxsize=INTERCITY_PARSE_CACHE)
+def _lowest_price(text: str, default_dollar: str) -> Optional[Tuple[float, str]]:
     prices = _gather_prices(text or "", default_dollar)
     if not prices: return None
-    amt, ccy = min(prices, key=lambda t: t[0])
-    return {"amount": round(amt, 2), "currency": ccy}
+    return min(prices, key=lambda t: t[0])
+
+def _parse_lowest_price(text: str, default_dollar: str) -> Optional[Dict[str, Any]]:
+    # the memoized part returns a tuple; callers get a fresh dict they may keep/mutate
+    best = _lowest_price(text, default_dollar)
+    if best is None: return None
+    return {"amount": round(best[0], 2), "currency": best[1]}
 
 # ===================== FX helpers =====================
-def _preferred_dollar(city_country_map: Dict[str,str], fx_meta_currency_by_country: Dict[str,str], city_a: str, city_b: str) -> str:
-    for city in (city_a, city_b):
-        ctry = (city_country_map or {}).get(city, "")
-        ccy = (fx_meta_currency_by_country or {}).get(ctry)
-        if ccy in ("USD","CAD","AUD","NZD","SGD"):
-            return ccy
-    return "USD"
+_DOLLAR_CCYS = ("USD","CAD","AUD","NZD","SGD")
+
+def _dollar_by_city(cities: List[str], city_country_map: Dict[str,str], fx_meta_currency_by_country: Dict[str,str]) -> Dict[str, Optional[str]]:
+    """City -> its local '$' currency (None when the country isn't a dollar country); resolved once per call."""
+    ccm = city_country_map or {}
+    cbc = fx_meta_currency_by_country or {}
+    out: Dict[str, Optional[str]] = {}
+    for city in cities:
+        ccy = cbc.get(ccm.get(city, ""))
+        out[city] = ccy if ccy in _DOLLAR_CCYS else None
+    return out
+
+def _preferred_dollar(dollar_by_city: Dict[str, Optional[str]], city_a: str, city_b: str) -> str:
+    return dollar_by_city.get(city_a) or dollar_by_city.get(city_b) or "USD"
 
 def _convert_to_target(price: Optional[Dict[str, Any]], fx: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not price or not fx:
@@ -214,11 +292,7 @@ def _tokens_from_prefs(mode: str, prefs: Dict[str, Any], musts: List[str], trave
         if seat_class: toks.append(seat_class)
 
     toks += [m for m in musts if isinstance(m, str) and len(m.split()) <= 4]
-    seen, out = set(), []
-    for t in [x for x in toks if str(x).strip()]:
-        if t not in seen:
-            seen.add(t); out.append(t)
-    return out
+    return list(dict.fromkeys(x for x in toks if str(x).strip()))  # ordered de-dupe
 
 def _compose_queries_for_mode(a: str, b: str, mode: str, prefs: Dict[str,Any], musts: List[str],
                               travelers: Optional[Dict[str,int]], language: Optional[str],
@@ -238,17 +312,17 @@ def _compose_queries_for_mode(a: str, b: str, mode: str, prefs: Dict[str,Any], m
             " ".join(tok[4:8]).strip(),
             " ".join(tok[8:12]).strip(),
         ]
+        chunks = list(dict.fromkeys(ch for ch in chunks if ch))
+        if INTERCITY_BATCH_MODE_QUERIES:
+            # same terms the variant budget would have searched, folded into a single query
+            picked = chunks[: max(0, max_variants - 1)]
+            if picked:
+                return [f"{base} {' OR '.join(picked)}{lang}"]
+            return variants
         for ch in chunks:
-            if ch:
-                variants.append(f"{base} {ch}{lang}")
-
-    seen, out = set(), []
-    for q in variants:
-        if q not in seen:
-            seen.add(q); out.append(q)
-        if len(out) >= max_variants:
-            break
-    return out
+            variants.append(f"{base} {ch}{lang}")
+
+    return list(dict.fromkeys(variants))[:max_variants]
 
 # ===================== API models =====================
 class Money(BaseModel):
@@ -304,11 +378,95 @@ class IntercityDiscoveryResult(BaseModel):
     errors: List[Dict[str, str]] = Field(default_factory=list)
 
 # ===================== Tavily wrappers =====================
+@lru_cache(maxsize=1)
+def _tavily_for_key(key: str) -> TavilyClient:
+    tv = TavilyClient(api_key=key)
+    # hops x modes x variants all hit one host; requests' default pool (10) would
+    # drop the extra keep-alive connections and re-handshake on the next call
+    sess = getattr(tv, "session", None)
+    if HTTPAdapter is not None and hasattr(sess, "mount"):
+        sess.mount("https://", HTTPAdapter(
+            pool_connections=INTERCITY_HTTP_POOL,
+            pool_maxsize=INTERCITY_HTTP_POOL,
+            max_retries=Retry(total=2, backoff_factor=0.2),
+        ))
+    return tv
+
 def _tavily() -> TavilyClient:
     key = os.getenv("TAVILY_API_KEY", "")
     if not key:
         raise RuntimeError("TAVILY_API_KEY is not set")
-    return TavilyClient(api_key=key)
+    return _tavily_for_key(key)
+
+def _reset_clients() -> None:
+    """Drop the cached Tavily client (tests / key rotation)."""
+    _tavily_for_key.cache_clear()
+
+# ---- search cache: in-process dict in front of a best-effort disk cache ----
+_SEARCH_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # key -> (fetched_at, response)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+def _search_cache_key(q: str, max_results: int, include_answer: bool) -> str:
+    return "\x00".join((q, INTERCITY_SEARCH_DEPTH, str(max_results), str(bool(include_answer)), str(INTERCITY_INCLUDE_RAW)))
+
+def _disk_cache_path(key_text: str) -> Optional[str]:
+    if not INTERCITY_CACHE_DIR:
+        return None
+    digest = hashlib.blake2b(key_text.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(INTERCITY_CACHE_DIR, f"search-{digest}.json")
+
+def _disk_cache_get(key_text: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+    path = _disk_cache_path(key_text)
+    if not path:
+        return None
+    try:
+        fetched_at = os.path.getmtime(path)
+        if time.time() - fetched_at > INTERCITY_CACHE_TTL_SEC:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return fetched_at, json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _disk_cache_set(key_text: str, value: Dict[str, Any]) -> None:
+    path = _disk_cache_path(key_text)
+    if not path:
+        return
+    try:
+        os.makedirs(INTERCITY_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)  # atomic: concurrent readers never see a partial file
+    except (OSError, TypeError, ValueError):
+        pass
+
+def _cached_search(tv: TavilyClient, q: str, max_results: int, include_answer: bool) -> Dict[str, Any]:
+    """tv.search with a TTL cache; empty/failed responses are never cached."""
+    key = _search_cache_key(q, max_results, include_answer)
+    hit = _SEARCH_CACHE.get(key)
+    if hit is not None and time.time() - hit[0] <= INTERCITY_CACHE_TTL_SEC:
+        return hit[1]
+
+    hit = _disk_cache_get(key)
+    if hit is None:
+        sr = tv.search(
+            q,
+            max_results=max_results,
+            include_answer=include_answer,
+            search_depth=INTERCITY_SEARCH_DEPTH,
+            include_raw_content=INTERCITY_INCLUDE_RAW,
+        ) or {}
+        if not (sr.get("results") or sr.get("answer")):
+            return sr
+        _disk_cache_set(key, sr)
+        hit = (time.time(), sr)
+
+    with _SEARCH_CACHE_LOCK:
+        if key not in _SEARCH_CACHE and len(_SEARCH_CACHE) >= INTERCITY_CACHE_MAX:
+            _SEARCH_CACHE.pop(next(iter(_SEARCH_CACHE)))  # oldest insert goes first
+        _SEARCH_CACHE[key] = hit
+    return hit[1]
 
 def _merge_answers_and_results(sr: Dict[str, Any], include_answer: bool) -> Tuple[str, List[str]]:
     answer = (sr.get("answer") or "") if include_answer else ""
@@ -319,41 +477,34 @@ def _merge_answers_and_results(sr: Dict[str, Any], include_answer: bool) -> Tupl
             urls.append(u)
     return (answer or ""), urls
 
-def _search_and_collect(tv: TavilyClient, queries: List[str], max_results: int, include_answer: bool) -> Tuple[str, List[str], List[str]]:
+# One long-lived pool for every search of every call: no per-hop/per-mode pools to spin up,
+# and only leaf (network) jobs run on it, so nothing on the pool ever waits on the pool.
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=INTERCITY_POOL_WORKERS, thread_name_prefix="intercity")
+atexit.register(_SEARCH_POOL.shutdown, wait=False)
+
+def _collect_search_results(results: List[Dict[str, Any]], include_answer: bool) -> Tuple[str, List[str], List[str]]:
     """
-    Run several variant queries in PARALLEL; return combined answers text, combined snippets (titles+contents),
-    and a de-duped URL list (in order).
+    Fold one mode's variant responses (in arrival order) into combined answers text,
+    combined snippets (titles+contents), and a de-duped URL list (in order).
     """
     answers: List[str] = []
     snippets: List[str] = []
     urls: List[str] = []
     seen_urls = set()
 
-    def _run(q: str) -> Dict[str, Any]:
-        return tv.search(
-            q,
-            max_results=max_results,
-            include_answer=include_answer,
-            search_depth=INTERCITY_SEARCH_DEPTH,
-            include_raw_content=INTERCITY_INCLUDE_RAW,
-        ) or {}
-
-    with ThreadPoolExecutor(max_workers=min(INTERCITY_QUERY_WORKERS, max(1, len(queries)))) as pool:
-        futs = {pool.submit(_run, q): q for q in queries}
-        for fut in as_completed(futs):
-            sr = fut.result()
-            ans, ulist = _merge_answers_and_results(sr, include_answer)
-            if ans: answers.append(ans)
+    for sr in results:
+        ans, ulist = _merge_answers_and_results(sr, include_answer)
+        if ans: answers.append(ans)
 
-            for u in ulist:
-                if u not in seen_urls:
-                    seen_urls.add(u); urls.append(u)
+        for u in ulist:
+            if u not in seen_urls:
+                seen_urls.add(u); urls.append(u)
 
-            for r in (sr.get("results") or []):
-                title = (r.get("title") or "").strip()
-                content = (r.get("content") or "").strip()
-                if title: snippets.append(title)
-                if content: snippets.append(content)
+        for r in (sr.get("results") or []):
+            title = (r.get("title") or "").strip()
+            content = (r.get("content") or "").strip()
+            if title: snippets.append(title)
+            if content: snippets.append(content)
 
     return ("  ".join(answers).strip()), snippets, urls
 
@@ -376,9 +527,11 @@ _OFFICIALISH_TOKENS = (
     "jrpass", "jrrail", "amtrak", "eurostar", "tfl", "rta", "mta", "cta", "sbb",
     "nre", "bahn", "renfe", "via-rail"
 )
+# one C-level scan over the lower-cased URL instead of a Python `in` per token
+_OFFICIALISH_RE = re.compile("|".join(map(re.escape, dict.fromkeys(_OFFICIALISH_TOKENS))))
+
 def _officialish(u: str) -> bool:
-    lo = (u or "").lower()
-    return any(tok in lo for tok in _OFFICIALISH_TOKENS)
+    return _OFFICIALISH_RE.search((u or "").lower()) is not None
 
 # ===================== Main tool =====================
 def intercity_discovery_tool(args: IntercityDiscoveryArgs) -> IntercityDiscoveryResult:
@@ -405,53 +558,148 @@ def intercity_discovery_tool(args: IntercityDiscoveryArgs) -> IntercityDiscovery
     out: Dict[str, HopResult] = {}
 
     language = _pref_language(args.preferences)
+    currency_by_country = fx.get("currency_by_country") or (args.fx or {}).get("currency_by_country") or {}
+
+    def _mode_result(results: List[Dict[str, Any]], dollar_ccy: str) -> ModeResult:
+        answer_text, snippets, urls = _collect_search_results(results, args.include_answer)
+
+        # Prioritize officialish sources before trimming to N
+        urls = sorted(dict.fromkeys(urls), key=lambda u: (0 if _officialish(u) else 1, u))
+        urls = urls[: args.sources_per_mode]
+
+        dur, price_native, summary = _parse_mode_from_blobs(answer_text, snippets, dollar_ccy)
+        price_target = _convert_to_target(price_native, fx) if price_native else None
+
+        note_bits = ["tavily.search multi-variant"]
+        if args.preferences.get("direct_only"): note_bits.append("direct_only")
+        if args.preferences.get("night_train"): note_bits.append("night_train")
+        if args.preferences.get("avoid_overnight"): note_bits.append("avoid_overnight")
+        if language: note_bits.append(f"lang:{language}")
+
+        return ModeResult(
+            duration_min=dur,
+            price=(None if price_native is None else Money(**price_native)),
+            price_target=(None if price_target is None else Money(**price_target)),
+            summary=summary,
+            sources=urls,
+            note="; ".join(note_bits)
+        )
 
-    def _process_hop(a: str, b: str) -> Tuple[str, HopResult]:
-        hop_key = f"{a} -> {b}"
-        res = HopResult()
-        dollar_ccy = _preferred_dollar(args.city_country_map or {}, (fx.get("currency_by_country") or (args.fx or {}).get("currency_by_country") or {}), a, b)
-
-        def _run_mode(mode: str) -> ModeResult:
+    # Plan (hop, mode) searches and put their variant queries on the shared pool;
+    # responses are bucketed per (hop, mode) in arrival order and reduced on this thread.
+    dollar_by_city = _dollar_by_city(cities, args.city_country_map or {}, currency_by_country)
+    dollars = [_preferred_dollar(dollar_by_city, a, b) for a, b in hops]
+    responses: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+    failures: Dict[Tuple[int, str], Exception] = {}
+    outstanding: Dict[Tuple[int, str], int] = {}
+    futs = {}
+    # args.max_workers caps this call's share of the shared pool; a slot frees when
+    # its future finishes or is cancelled (done callbacks fire on cancel too)
+    slots = threading.Semaphore(args.max_workers)
+    release = lambda _f: slots.release()
+
+    def _submit(hi: int, mode: str) -> None:
+        key = (hi, mode)
+        a, b = hops[hi]
+        try:
             queries = _compose_queries_for_mode(
                 a=a, b=b, mode=mode, prefs=args.preferences, musts=args.musts,
                 travelers=args.travelers, language=language, max_variants=args.max_query_variants
             )
-            answer_text, snippets, urls = _search_and_collect(
-                tv, queries, max_results=args.max_results_per_query, include_answer=args.include_answer
-            )
-
-            # Prioritize officialish sources before trimming to N
-            urls = sorted(dict.fromkeys(urls), key=lambda u: (0 if _officialish(u) else 1, u))
-            urls = urls[: args.sources_per_mode]
-
-            dur, price_native, summary = _parse_mode_from_blobs(answer_text, snippets, dollar_ccy)
-            price_target = _convert_to_target(price_native, fx) if price_native else None
-
-            note_bits = ["tavily.search multi-variant"]
-            if args.preferences.get("direct_only"): note_bits.append("direct_only")
-            if args.preferences.get("night_train"): note_bits.append("night_train")
-            if args.preferences.get("avoid_overnight"): note_bits.append("avoid_overnight")
-            if language: note_bits.append(f"lang:{language}")
-
-            return ModeResult(
-                duration_min=dur,
-                price=(None if price_native is None else Money(**price_native)),
-                price_target=(None if price_target is None else Money(**price_target)),
-                summary=summary,
-                sources=urls,
-                note="; ".join(note_bits)
-            )
+        except Exception as e:
+            failures[key] = e
+            return
+        responses[key] = []
+        outstanding[key] = len(queries)
+        for q in queries:
+            slots.acquire()
+            try:
+                fut = _SEARCH_POOL.submit(_cached_search, tv, q, args.max_results_per_query, args.include_answer)
+            except BaseException:
+                slots.release()
+                raise
+            fut.add_done_callback(release)
+            futs[fut] = key
+
+    def _reduce(hi: int, mode: str) -> ModeResult:
+        if (hi, mode) in failures:
+            raise failures[(hi, mode)]
+        return _mode_result(responses[(hi, mode)], dollars[hi])
+
+    # Long-haul kill switch: rail/bus would be suppressed on a long-haul hop anyway,
+    # so when enabled they are only searched once the hop's flight turns out short.
+    flight_first = INTERCITY_SKIP_LONGHAUL_SEARCHES and "flight" in run_modes and len(run_modes) > 1
+    settled: Dict[Tuple[int, str], Any] = {}  # (hop, mode) -> ModeResult or the error, reduced as soon as it lands
+    skipped = set()
+
+    def _settle(hi: int, mode: str) -> None:
+        # parse a finished mode right away, while other modes' searches are still on the wire
+        try:
+            settled[(hi, mode)] = _reduce(hi, mode)
+        except Exception as e:
+            settled[(hi, mode)] = e
+
+    def _after_flight(hi: int) -> None:
+        fr = settled[(hi, "flight")]
+        if isinstance(fr, ModeResult) and fr.duration_min is not None and fr.duration_min >= int(args.longhaul_minutes):
+            skipped.update((hi, m) for m in run_modes if m != "flight")
+        else:
+            for m in run_modes:
+                if m != "flight":
+                    _submit(hi, m)
+
+    for hi in range(len(hops)):
+        for mode in (("flight",) if flight_first else run_modes):
+            _submit(hi, mode)
+    if flight_first:
+        for hi in range(len(hops)):
+            if not outstanding.get((hi, "flight")):  # nothing in flight for it (compose failed)
+                _settle(hi, "flight")
+                _after_flight(hi)
+
+    def _answered(hi: int, mode: str) -> bool:
+        answer_text = _collect_search_results(responses[(hi, mode)], args.include_answer)[0]
+        return (_parse_best_duration_minutes(answer_text) is not None
+                and _parse_lowest_price(answer_text, dollars[hi]) is not None)
+
+    while futs:
+        done, _ = wait(futs, return_when=FIRST_COMPLETED)
+        for fut in done:
+            key = futs.pop(fut, None)
+            if key is None:  # its mode already settled early
+                continue
+            try:
+                responses[key].append(fut.result())
+            except Exception as e:
+                failures.setdefault(key, e)  # first failure (in arrival order) names the mode error
+            outstanding[key] -= 1
+            if INTERCITY_EARLY_EXIT and outstanding[key] and key not in failures and _answered(*key):
+                # queued variants are cancelled; running ones finish in the background (and still fill the cache)
+                for f in [f for f, k in futs.items() if k == key]:
+                    f.cancel()
+                    del futs[f]
+                outstanding[key] = 0
+            if not outstanding[key]:
+                _settle(*key)
+                if flight_first and key[1] == "flight":
+                    _after_flight(key[0])
+
+    for hi, (a, b) in enumerate(hops):
+        hop_key = f"{a} -> {b}"
+        res = HopResult()
 
         mode_payloads: Dict[str, ModeResult] = {}
-        with ThreadPoolExecutor(max_workers=min(3, len(run_modes) or 1)) as pool:
-            futs = {pool.submit(_run_mode, m): m for m in run_modes}
-            for fut in as_completed(futs):
-                m = futs[fut]
-                try:
-                    mode_payloads[m] = fut.result()
-                except Exception as e:
-                    logs.append(f"Intercity[{hop_key}] mode={m} error: {e}")
-                    mode_payloads[m] = ModeResult(note="error")
+        for m in run_modes:
+            if (hi, m) in skipped:
+                continue
+            try:
+                got = settled.get((hi, m))
+                if isinstance(got, Exception):
+                    raise got
+                mode_payloads[m] = got if got is not None else _reduce(hi, m)
+            except Exception as e:
+                logs.append(f"Intercity[{hop_key}] mode={m} error: {e}")
+                mode_payloads[m] = ModeResult(note="error")
 
         if "rail"   in mode_payloads: res.rail   = mode_payloads["rail"]
         if "bus"    in mode_payloads: res.bus    = mode_payloads["bus"]
@@ -478,14 +726,7 @@ def intercity_discovery_tool(args: IntercityDiscoveryArgs) -> IntercityDiscovery
             f"bus={res.bus.duration_min}m, flight={res.flight.duration_min}m → {res.recommended}"
             + (" (long-haul)" if is_longhaul else "")
         )
-        return hop_key, res
-
-    max_workers = min(int(args.max_workers), len(hops) or 1)
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futs = {pool.submit(_process_hop, a, b): (a, b) for a, b in hops}
-        for fut in as_completed(futs):
-            hop_key, payload = fut.result()
-            out[hop_key] = payload
+        out[hop_key] = res
 
     return IntercityDiscoveryResult(hops=out, logs=logs, errors=errors)
 
@@ -589,7 +830,9 @@ if __name__ == "__main__":
         },
     ]
 
-    for t in tests:
-        start = time.time()
-        result = intercity_discovery_tool(t["args"])
-        _print_result(t["name"], result, start)
+    # independent, network-bound cases: run them side by side, print as each finishes
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=len(tests)) as pool:
+        futs = {pool.submit(intercity_discovery_tool, t["args"]): t for t in tests}
+        for fut in as_completed(futs):
+            _print_result(futs[fut]["name"], fut.result(), start)